@@ -0,0 +1,86 @@
+"""Check the import cost of the plugin against a budget with `python -X importtime`.
+
+Loads the plugin in a fresh interpreter after nonebot and the plugins it requires, which
+a bot loads anyway, so only the cost of this plugin and its own dependencies is counted.
+Exits with status 1 when the best of several runs is over the budget.
+
+    python benchmarks/check_importtime.py --budget-ms 45
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+MARKER = "--- loading nonebot_plugin_yareminder ---"
+SHARED_PLUGINS = (
+    "nonebot_plugin_localstore", "nonebot_plugin_orm", "nonebot_plugin_saa", "nonebot_plugin_alconna",
+    "nonebot_plugin_apscheduler",
+)
+BOOTSTRAP = f"""
+import sys
+import nonebot
+nonebot.init(
+    driver="~none",
+    sqlalchemy_database_url="sqlite+aiosqlite:///" + sys.argv[1] + "/bench.sqlite3",
+    localstore_data_dir=sys.argv[1] + "/data",
+    localstore_cache_dir=sys.argv[1] + "/cache",
+    localstore_config_dir=sys.argv[1] + "/config",
+    log_level="ERROR",
+)
+for plugin in {SHARED_PLUGINS!r}:
+    nonebot.require(plugin)
+print({MARKER!r}, file=sys.stderr, flush=True)
+nonebot.load_plugin("nonebot_plugin_yareminder")
+"""
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=45, help="allowed import time of the plugin")
+    parser.add_argument("--runs", type=int, default=5, help="the best run is compared with the budget")
+    parser.add_argument("--scheduler", choices=("queue", "apscheduler"), default="queue")
+    parser.add_argument("--top", type=int, default=10, help="modules to list by self time")
+    return parser.parse_args()
+
+
+def measure(scheduler: str) -> tuple[float, list[tuple[float, str]]]:
+    """Import the plugin once, returns the total in ms and the (self ms, module) of every import"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        env = {**os.environ, "PYTHONPATH": str(ROOT), "YAREMINDER_SCHEDULER": scheduler}
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", BOOTSTRAP, data_dir],
+            cwd=data_dir, env=env, capture_output=True, text=True
+        )
+    if process.returncode != 0:
+        sys.exit(f"Loading the plugin failed:\n{process.stderr[-2000:]}")
+
+    total, modules = 0.0, []
+    _, _, log = process.stderr.partition(MARKER)
+    for match in IMPORTTIME_LINE.finditer(log):
+        self_us, cumulative_us, indent, module = match.groups()
+        modules.append((int(self_us) / 1000, module))
+        # Top level imports include the time of everything they import
+        if not indent:
+            total += int(cumulative_us) / 1000
+    return total, modules
+
+
+def main():
+    args = parse_args()
+    runs = [measure(args.scheduler) for _ in range(args.runs)]
+    total, modules = min(runs)
+    print(f"Import time of nonebot_plugin_yareminder ({args.scheduler}): best {total:.1f} ms, "
+          f"worst {max(run[0] for run in runs):.1f} ms of {args.runs} runs, budget {args.budget_ms:.0f} ms")
+    for self_ms, module in sorted(modules, reverse=True)[:args.top]:
+        print(f"  {self_ms:7.2f} ms  {module}")
+    if total > args.budget_ms:
+        sys.exit(f"Import time {total:.1f} ms is over the budget of {args.budget_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Fixtures benchmarking the plugin against a synthetic SQLite dataset with pytest-benchmark.
+
+nonebot is initialized once per session on a temp-file database. The dataset is seeded once,
+its size is set with the `--bench-*` options. Messages go to a stub sender that records them
+instead of sending.
+
+    pytest benchmarks --bench-tasks 2000 --benchmark-json before.json
+    pytest benchmarks --bench-tasks 2000 --benchmark-autosave
+    pytest benchmarks --bench-tasks 2000 --benchmark-compare
+"""
+import asyncio
+import random
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import nonebot
+import pytest
+
+DATASET_OPTIONS = {
+    "chats": 20,
+    "tasks": 1000,
+    "assignees": 200,
+    "assignees_per_task": 5,
+    "records": 20000,
+    "seed": 0,
+}
+
+sent_messages = []
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("yareminder", "synthetic dataset of the benchmarks")
+    for name, default in DATASET_OPTIONS.items():
+        group.addoption(f"--bench-{name.replace('_', '-')}", dest=f"bench_{name}", type=int, default=default)
+
+
+def pytest_configure(config):
+    data_dir = Path(tempfile.mkdtemp(prefix="yareminder-bench-"))
+    nonebot.init(
+        driver="~none",
+        sqlalchemy_database_url=f"sqlite+aiosqlite:///{data_dir / 'bench.sqlite3'}",
+        alembic_startup_check=False,
+        localstore_data_dir=str(data_dir / "data"),
+        localstore_cache_dir=str(data_dir / "cache"),
+        localstore_config_dir=str(data_dir / "config"),
+        log_level="ERROR",
+        # Measure the service, not the send rate limits
+        yareminder_platform_rate=1e9,
+        yareminder_platform_burst=1e9,
+        yareminder_target_rate=1e9,
+        yareminder_target_burst=1e9,
+    )
+    nonebot.load_plugin("nonebot_plugin_yareminder")
+
+
+def pytest_benchmark_update_json(config, benchmarks, output_json):
+    """Record the dataset next to the results, runs are only comparable on the same one"""
+    output_json["dataset"] = {name: config.getoption(f"bench_{name}") for name in DATASET_OPTIONS}
+    output_json["messages_sent"] = len(sent_messages)
+
+
+@pytest.fixture(scope="session")
+def loop():
+    """One event loop for the session, the pooled database connections belong to it"""
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(scope="session")
+def run(loop):
+    """Run a coroutine function to completion, for the synchronous benchmark callables"""
+    return lambda body, *args, **kwargs: loop.run_until_complete(body(*args, **kwargs))
+
+
+@pytest.fixture(scope="session")
+def stub_sender():
+    from nonebot_plugin_saa import MessageFactory
+
+    async def send_to(self, target, bot=None, **kwargs):
+        sent_messages.append((target, self))
+
+    MessageFactory.send_to = send_to
+
+
+@pytest.fixture(scope="session")
+def dataset(pytestconfig, run, stub_sender) -> dict:
+    """Bulk insert the synthetic dataset, returns handles used by the benchmarks"""
+    from nonebot_plugin_orm import init_orm
+
+    options = {name: pytestconfig.getoption(f"bench_{name}") for name in DATASET_OPTIONS}
+    run(init_orm)
+    return run(seed, **options)
+
+
+async def seed(chats: int, tasks: int, assignees: int, assignees_per_task: int, records: int, seed: int) -> dict:
+    from nonebot_plugin_orm import get_session
+    from nonebot_plugin_saa import TargetQQGroup
+    from sqlalchemy import insert
+    from nonebot_plugin_yareminder.models import (
+        TargetModel, TaskModel, AssigneeModel, AssignmentModel, RecordModel, serialize_target
+    )
+    from nonebot_plugin_yareminder.service import TaskService
+    from nonebot_plugin_yareminder.utils import RecurType
+
+    rng = random.Random(seed)
+    now = datetime.now().replace(microsecond=0)
+    target_list = [TargetQQGroup(group_id=10000 + i) for i in range(chats)]
+    assignee_rows = [{"id": str(uuid.uuid4()), "user_id": str(20000 + i)} for i in range(assignees)]
+    task_rows, assignment_rows, record_rows = [], [], []
+    for i in range(tasks):
+        task_id = str(uuid.uuid4())
+        members = rng.sample(assignee_rows, min(assignees_per_task, len(assignee_rows)))
+        task_rows.append({
+            "id": task_id, "name": f"task{i}", "target_id": i % chats + 1,
+            "due_time": now + timedelta(minutes=rng.randint(-600, 6000)),
+            "remind_offset": timedelta(hours=-1), "remind_interval": timedelta(hours=1),
+            "recur_interval": timedelta(days=1), "recur_type": RecurType.Regular,
+            "current_assignment_order": 0, "is_deleted": False, "deleted_at": datetime.min,
+        })
+        assignment_rows += [
+            {"id": str(uuid.uuid4()), "task_id": task_id, "assignee_id": member["id"], "order": order}
+            for order, member in enumerate(members)
+        ]
+    for _ in range(records):
+        task = rng.choice(task_rows)
+        due_time = task["due_time"] - timedelta(days=rng.randint(1, 365))
+        finish_time = due_time + timedelta(minutes=rng.randint(-600, 3000))
+        record_rows.append({
+            "id": str(uuid.uuid4()), "task_id": task["id"], "assignee_id": rng.choice(assignee_rows)["id"],
+            "due_time": due_time, "finish_time": finish_time,
+            "delay_seconds": (finish_time - due_time).total_seconds(),
+        })
+
+    async with get_session() as session:
+        await session.execute(
+            insert(TargetModel), [{"id": i + 1, "serial": serialize_target(t)} for i, t in enumerate(target_list)]
+        )
+        for model, rows in (
+                (AssigneeModel, assignee_rows), (TaskModel, task_rows),
+                (AssignmentModel, assignment_rows), (RecordModel, record_rows)
+        ):
+            if rows:
+                await session.execute(insert(model), rows)
+        await session.commit()
+    async with TaskService(get_session()) as task_service:
+        await task_service.rebuild_delay_rollups()
+
+    return {
+        "rng": rng, "targets": target_list, "tasks": task_rows, "assignees": assignee_rows,
+        "assignments": [a for a in assignment_rows if a["task_id"] == task_rows[0]["id"]],
+    }
@@ -0,0 +1,107 @@
+"""Benchmarks of the hot service paths, every round on a random task or chat of the dataset"""
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from nonebot_plugin_orm import get_session
+
+from nonebot_plugin_yareminder.service import TaskService, AssigneeService, task_lookup_cache
+from nonebot_plugin_yareminder.utils import RecurType
+
+
+@pytest.fixture
+def random_task(dataset):
+    rng, targets, tasks = dataset["rng"], dataset["targets"], dataset["tasks"]
+
+    def random_task():
+        task = rng.choice(tasks)
+        return task["id"], task["name"], targets[task["target_id"] - 1]
+
+    return random_task
+
+
+def test_search_task(benchmark, run, random_task):
+    async def search_task():
+        _, name, target = random_task()
+        async with TaskService(get_session()) as task_service:
+            (await task_service.search_task(name, target)).scalar_one()
+
+    benchmark(run, search_task)
+
+
+def test_find_task_id_cold(benchmark, run, random_task):
+    async def find_task_id():
+        _, name, target = random_task()
+        async with TaskService(get_session()) as task_service:
+            await task_service.find_task_id(name, target)
+
+    benchmark.pedantic(run, (find_task_id,), setup=task_lookup_cache.clear, rounds=50)
+
+
+def test_describe_task(benchmark, run, random_task):
+    async def describe_task():
+        task_id, _, _ = random_task()
+        async with TaskService(get_session()) as task_service:
+            await task_service.describe_task(task_id)
+
+    benchmark(run, describe_task)
+
+
+def test_ls(benchmark, run, dataset):
+    async def ls():
+        async with TaskService(get_session()) as task_service:
+            task_service.render_task_list(await task_service.list_tasks(dataset["rng"].choice(dataset["targets"])), "")
+
+    benchmark(run, ls)
+
+
+def test_stat_delay(benchmark, run, dataset):
+    async def stat_delay():
+        assignment = dataset["rng"].choice(dataset["assignments"])
+        async with TaskService(get_session()) as task_service:
+            await task_service.stat_delay(assignment["task_id"], assignment["assignee_id"])
+
+    benchmark(run, stat_delay)
+
+
+def test_add_assignees(benchmark, run, dataset):
+    async def add_assignees():
+        async with AssigneeService(get_session()) as assignee_service:
+            await assignee_service.add_assignees([a["user_id"] for a in dataset["rng"].sample(dataset["assignees"], 20)])
+
+    benchmark(run, add_assignees)
+
+
+def test_create_assignments(benchmark, run, dataset):
+    rng = dataset["rng"]
+
+    async def new_task():
+        async with TaskService(get_session()) as task_service:
+            task_id = await task_service.create_task(
+                f"bench{uuid.uuid4().hex}", datetime.now() + timedelta(days=1), timedelta(hours=-1),
+                timedelta(hours=1), timedelta(days=1), RecurType.Regular, rng.choice(dataset["targets"])
+            )
+        return task_id, [a["id"] for a in rng.sample(dataset["assignees"], min(30, len(dataset["assignees"])))]
+
+    async def create_assignments(task_id, assignee_ids):
+        async with TaskService(get_session()) as task_service:
+            await task_service.create_assignments(task_id, assignee_ids)
+
+    # A fresh task every round, untimed
+    benchmark.pedantic(run, setup=lambda: ((create_assignments, *run(new_task)), {}), rounds=50)
+
+
+def test_finish_task(benchmark, run, random_task):
+    async def finish_task():
+        task_id, _, _ = random_task()
+        async with TaskService(get_session()) as task_service:
+            await task_service.finish_task(task_id)
+
+    benchmark(run, finish_task)
+
+
+def test_send_reminder_for_all(benchmark, run, dataset):
+    async def send_reminder_for_all():
+        await TaskService.send_reminder_for_all({dataset["rng"].choice(dataset["targets"])})
+
+    benchmark(run, send_reminder_for_all)
@@ -0,0 +1,58 @@
+"""Throughput of the command argument time parsers.
+
+Every round parses a corpus of ISO and Chinese due times or durations, with cold and warm
+caches, next to pendulum.parse on the ISO part of it. Whole `rmd` commands are timed through
+the Alconna command parser.
+"""
+import itertools
+
+import pendulum
+import pytest
+
+from nonebot_plugin_yareminder.timeparse import compile_datetime, parse_timedelta, to_datetime, to_timedelta
+from nonebot_plugin_yareminder.command.alconna import alc
+
+ISO_DATETIMES = ["2024-05-01", "2024-05-01 08:00", "2024-05-01T08:00:00", "2024-05-01T08:00:00+08:00", "20240501T0800"]
+CHINESE_DATETIMES = ["明天8点", "后天下午3点半", "下周三", "周五晚上8:30", "12月25号8点", "3天后", "半小时后", "今天中午12点"]
+DURATIONS = ["3d5h19m1s", "-5h30m", "1d", "3天", "2小时30分", "半小时", "每2周", "提前1天"]
+# Task names are numbered, as Alconna caches the results of whole messages
+COMMANDS = [
+    "rmd add 洗碗{n} 明天8点 -i 2小时 -o 提前1天 -r 每天",
+    "rmd add 倒垃圾{n} 2024-05-01T08:00:00 -i 3h -o -1d -r 2d",
+    "rmd due 洗碗{n} --set 下周三下午3点",
+    "rmd remind 洗碗{n} -o -30m -i 1h",
+]
+
+
+def parse_all(parse, inputs: list[str]):
+    for s in inputs:
+        parse(s)
+
+
+def clear_caches():
+    compile_datetime.cache_clear()
+    parse_timedelta.cache_clear()
+
+
+@pytest.mark.parametrize(("parse", "inputs", "cold"), [
+    pytest.param(pendulum.parse, ISO_DATETIMES, False, id="pendulum_iso"),
+    pytest.param(to_datetime, ISO_DATETIMES, True, id="datetime_iso_cold"),
+    pytest.param(to_datetime, CHINESE_DATETIMES, True, id="datetime_chinese_cold"),
+    pytest.param(to_datetime, ISO_DATETIMES + CHINESE_DATETIMES, False, id="datetime_warm"),
+    pytest.param(to_timedelta, DURATIONS, True, id="timedelta_cold"),
+    pytest.param(to_timedelta, DURATIONS, False, id="timedelta_warm"),
+])
+def test_parse(benchmark, parse, inputs, cold):
+    benchmark.extra_info["inputs"] = len(inputs)
+    if cold:
+        benchmark.pedantic(parse_all, (parse, inputs), setup=clear_caches, rounds=2000)
+    else:
+        benchmark(parse_all, parse, inputs)
+
+
+def test_command(benchmark):
+    prefix = next(iter(alc.prefixes), "")
+    commands = (prefix + command.format(n=n) for n in itertools.count() for command in COMMANDS)
+
+    result = benchmark(lambda: alc.parse(next(commands)))
+    assert result.matched
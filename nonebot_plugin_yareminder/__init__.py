@@ -1,7 +1,8 @@
-from nonebot import require
+from nonebot import require, get_driver
 from nonebot.plugin import PluginMetadata, inherit_supported_adapters
 
 from .command import rmd_app
+from .config import Config, plugin_config
 
 require('nonebot_plugin_saa')
 require('nonebot_plugin_alconna')
@@ -12,6 +13,7 @@ __plugin_meta__ = PluginMetadata(
     usage=":rmd COMMAND [ARGS] [OPTIONS]",
     type="application",
     homepage="https://github.com/yao-yun/nonebot-plugin-yareminder",
+    config=Config,
     supported_adapters=inherit_supported_adapters('nonebot_plugin_saa', 'nonebot_plugin_alconna')
 )
 
@@ -21,10 +23,73 @@ enable_auto_select_bot()
 require("nonebot_plugin_localstore")
 from nonebot_plugin_localstore import get_data_dir
 
-require("nonebot_plugin_apscheduler")
-from nonebot_plugin_apscheduler import scheduler
-from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
-scheduler.add_jobstore(
-    SQLAlchemyJobStore(url="sqlite:///" + str(get_data_dir(__plugin_meta__.name) / "apscheduler.sqlite3")),
-    alias='nonebot-plugin-yareminder-jobstore'
-)
+if plugin_config.yareminder_scheduler == "queue":
+    # Reminders are derived from the task rows, the apscheduler job store is left unregistered so that
+    # jobs persisted by the apscheduler engine stay dormant
+    from nonebot import logger
+    from .service import TaskService
+    from .due_queue import due_queue
+
+    async def load_due_queue():
+        jobstore_path = get_data_dir(__plugin_meta__.name) / "apscheduler.sqlite3"
+        if jobstore_path.exists():
+            logger.warning(
+                f"Ignoring the reminder jobs of the apscheduler engine in {jobstore_path}, reminders are scheduled "
+                f"by the due queue from the tasks. Delete the file, or set YAREMINDER_SCHEDULER=apscheduler to keep "
+                f"using the apscheduler engine"
+            )
+        await TaskService.load_due_queue()
+
+    driver = get_driver()
+    driver.on_startup(load_due_queue)
+    driver.on_shutdown(due_queue.shutdown)
+else:
+    require("nonebot_plugin_apscheduler")
+    from nonebot_plugin_apscheduler import scheduler
+    from .service import TaskService
+
+    async def add_reminder_jobstore():
+        # Opening the sync SQLite engine is left to startup, the jobs are only touched once the bot runs
+        from .jobstore import ReminderJobStore
+        jobstore = ReminderJobStore(url="sqlite:///" + str(get_data_dir(__plugin_meta__.name) / "apscheduler.sqlite3"))
+        scheduler.add_jobstore(jobstore, alias='nonebot-plugin-yareminder-jobstore')
+        await TaskService.reconcile_reminders(jobstore)
+
+    get_driver().on_startup(add_reminder_jobstore)
+
+if plugin_config.yareminder_coalesce_window > 0:
+    from .service import reminder_coalescer
+
+    get_driver().on_shutdown(reminder_coalescer.flush)
+
+if (
+        plugin_config.yareminder_record_retention_days is not None
+        or plugin_config.yareminder_deleted_task_grace_days is not None
+):
+    from datetime import datetime, timedelta
+
+    require("nonebot_plugin_apscheduler")
+    from nonebot_plugin_apscheduler import scheduler
+    from .service import MaintenanceService
+
+    # Kept in the default in-memory job store, first run shortly after startup so that restarts do not starve it
+    scheduler.add_job(
+        MaintenanceService.run_maintenance, "interval", hours=plugin_config.yareminder_maintenance_interval,
+        next_run_time=datetime.now() + timedelta(minutes=5),
+        id="nonebot-plugin-yareminder-maintenance", replace_existing=True
+    )
+
+if plugin_config.yareminder_metrics_exporter is not None:
+    require("nonebot_plugin_apscheduler")
+    from nonebot_plugin_apscheduler import scheduler
+    from .metrics import metrics, create_exporter
+
+    metrics_exporter = create_exporter(
+        plugin_config.yareminder_metrics_exporter,
+        plugin_config.yareminder_metrics_path or get_data_dir(__plugin_meta__.name) / "metrics.prom"
+    )
+    scheduler.add_job(
+        metrics_exporter.export, "interval", seconds=plugin_config.yareminder_metrics_interval, args=[metrics],
+        id="nonebot-plugin-yareminder-metrics", replace_existing=True
+    )
+    get_driver().on_shutdown(lambda: metrics_exporter.export(metrics))
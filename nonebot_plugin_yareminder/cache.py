@@ -0,0 +1,63 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class TaskLookupCache:
+    """LRU cache with a TTL mapping a (target id, task name) lookup key to a task id.
+
+    Entries can be invalidated by key or by task id, so writes only need to know the task.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self._keys: dict[Any, Hashable] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable):
+        """Return the cached task id for `key`, or None on a miss"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            task_id, expires_at = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return task_id
+            self._drop(key)
+        self.misses += 1
+        return None
+
+    def put(self, key: Hashable, task_id):
+        if self.maxsize <= 0:
+            return
+        self._drop(key)
+        self._entries[key] = (task_id, time.monotonic() + self.ttl)
+        self._keys[task_id] = key
+        while len(self._entries) > self.maxsize:
+            self._drop(next(iter(self._entries)))
+
+    def invalidate(self, key: Hashable):
+        self._drop(key)
+
+    def invalidate_task(self, task_id):
+        key = self._keys.get(task_id)
+        if key is not None:
+            self._drop(key)
+
+    def clear(self):
+        self._entries.clear()
+        self._keys.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    def _drop(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None and self._keys.get(entry[0]) == key:
+            del self._keys[entry[0]]
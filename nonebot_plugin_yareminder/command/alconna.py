@@ -1,4 +1,5 @@
-from ..utils import to_datetime, to_timedelta, to_recurtype, RecurType
+from ..utils import to_recurtype, RecurType
+from ..timeparse import to_datetime, to_timedelta
 
 from nonebot import require, get_driver, logger
 from datetime import timedelta
@@ -38,7 +39,9 @@ alc = Alconna(
         "remind",
         Arg("task_name", str),
         Option("-o|--offset", Arg("remind_offset", to_timedelta)),
-        Option("-i|--interval", Arg("remind_interval", to_timedelta))
+        Option("-i|--interval", Arg("remind_interval", to_timedelta)),
+        Option("-e|--escalate", Arg("escalate_after", int)),
+        Option("--no-escalate")
     ),
     Subcommand(
         "recur",
@@ -52,9 +55,18 @@ alc = Alconna(
         Option("-r|--rm"),
         Arg("?assignees", MultiVar(At))
     ),
+    Subcommand(
+        "template",
+        # optional as a suffix flag, without a task name the templates of the chat are shown / changed
+        Arg("task_name?", str),
+        Option("--overdue"),
+        Option("--set", Arg("template_text", str)),
+        Option("--reset")
+    ),
     Subcommand(
         "stat",
-        Arg("task_name", str),
-        Arg("?assignees", MultiVar(At))
+        Arg("task_name?", str),
+        Option("--rebuild"),
+        Arg("assignees?", MultiVar(At, "*"))
     )
 )
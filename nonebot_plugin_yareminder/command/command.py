@@ -1,12 +1,18 @@
-from ..service import TaskService, AssigneeService, get_task_service, get_assignee_service
+from ..service import TaskService, AssigneeService, DelayStat, get_task_service, get_assignee_service
+from ..metrics import metrics
+from ..sql_trace import sql_tracer
+from ..template import TemplateError, PLACEHOLDERS, DEFAULT_REMINDER_TEMPLATE, DEFAULT_OVERDUE_TEMPLATE
 from .alconna import alc
-from ..utils import natural_lang_timedelta
 
-from nonebot import require, logger
+from nonebot import require, logger, on_message
 from nonebot.params import Depends
 from nonebot.adapters import Event
+from nonebot.matcher import Matcher
+from nonebot.message import run_postprocessor
+from nonebot.typing import T_State
 from typing import Annotated
-from uuid import UUID 
+from uuid import UUID
+from datetime import timedelta
 
 require("nonebot_plugin_saa")
 from nonebot_plugin_saa import SaaTarget, MessageFactory, Mention
@@ -18,19 +24,42 @@ require("nonebot_plugin_alconna")
 from nonebot_plugin_alconna import on_alconna, Arparma
 
 rmd_app = on_alconna(alc)
+# Learns the chats every assignee speaks in, where escalated reminders can reach them; never blocks other matchers
+reachability_recorder = on_message(priority=1, block=False)
 
 @rmd_app.handle()
-async def _(result: Arparma):
+async def _(result: Arparma, state: T_State):
     if not result.matched:
         await rmd_app.send(f"命令解析失败。用法：\n{alc.get_help()}")
         await rmd_app.finish()
+    # Statements are attributed through a context variable, the trace is closed by the postprocessor below
+    if sql_tracer is not None:
+        state["yareminder_sql_trace"] = sql_tracer.begin(next(iter(result.subcommands), "rmd"))
+
+
+@run_postprocessor
+async def _(matcher: Matcher):
+    if isinstance(matcher, rmd_app) and sql_tracer is not None:
+        trace = matcher.state.get("yareminder_sql_trace")
+        sql_tracer.end(trace)
+        metrics.end_command(trace)
+
+
+@reachability_recorder.handle()
+async def _(event: Event, saa_target: SaaTarget):
+    # None for events saa cannot reply to
+    if saa_target is None:
+        return
+    try:
+        user_id = event.get_user_id()
+    except ValueError:
+        return
+    await TaskService.record_reachability(user_id, saa_target)
 
 
 @rmd_app.assign("now")
-async def rmd_now(saa_target: SaaTarget, task_service: Annotated[TaskService, Depends(get_task_service)]):
-    task_ids = (await task_service.search_task(scope=saa_target)).scalars().all()
-    for task_id in task_ids:
-        await task_service.send_reminder(task_id)
+async def rmd_now(saa_target: SaaTarget):
+    await TaskService.send_reminder_for_all({saa_target})
 
 
 @rmd_app.assign("add")
@@ -47,7 +76,9 @@ async def rmd_add(result: Arparma, saa_target: SaaTarget, task_service: Annotate
         platform_target=saa_target
     )
     logger.info(f"Task created: {task_id}")
-    await (await task_service.describe_task(task_id)).send()
+    msg = await task_service.describe_task(task_id)
+    await task_service.commit()
+    await msg.send()
     logger.debug(f"Feedback sent")
     await rmd_app.finish()
 
@@ -55,23 +86,21 @@ async def rmd_add(result: Arparma, saa_target: SaaTarget, task_service: Annotate
 @rmd_app.assign("rm")
 async def rmd_delete(result: Arparma, saa_target: SaaTarget, task_service: Annotated[TaskService, Depends(get_task_service)]):
     try:
-        task_id: UUID = (await task_service.search_task(result["rm.task_name"], saa_target)).scalar_one()
-    except NoResultFound or MultipleResultsFound as e:
+        task_id: UUID = await task_service.find_task_id(result["rm.task_name"], saa_target)
+    except (NoResultFound, MultipleResultsFound) as e:
         logger.error(f"Unable to query task with name {result['rm.task_name']}: {e}")
         await rmd_app.finish(f"查找任务\"{result['rm.task_name']}\"时发生错误")
     else:
         await task_service.delete_task(task_id)
+        await task_service.commit()
         await rmd_app.finish(f"任务\"{result['rm.task_name']}\"已删除")
 
 
 @rmd_app.assign("ls")
 async def rmd_ls(saa_target: SaaTarget, task_service: Annotated[TaskService, Depends(get_task_service)]):
-    task_ids = (await task_service.search_task(scope=saa_target)).scalars().all()
-    msg = MessageFactory("当前会话中任务如下: ")
-    logger.debug(f"Listing tasks... Task_ids: {task_ids}")
-    for i in range(0, len(task_ids)):
-        description = await task_service.describe_task(task_ids[i])
-        msg += [f'\n{i+1}. '] + description
+    tasks = await task_service.list_tasks(scope=saa_target)
+    logger.debug(f"Listing tasks... Task_ids: {[task.id for task in tasks]}")
+    msg = task_service.render_task_list(tasks, "当前会话中任务如下: ")
     await msg.send()
     await rmd_app.finish()
 
@@ -83,27 +112,29 @@ async def rmd_finish(result: Arparma, saa_target: SaaTarget, event: Event, task_
     if not result["?task_name"]:
         logger.info(f"Try finish task in current chat for current user if one and only")
         logger.debug(f"current chat: {saa_target}, current user: {event.get_user_id()}")
-        task_ids = (await task_service.search_task(scope=saa_target, user_id=event.get_user_id(), include_deleted=False)).scalars().all()
+        tasks = await task_service.list_tasks(scope=saa_target, user_id=event.get_user_id())
+        task_ids = [task.id for task in tasks]
         if not task_ids:
             await rmd_app.finish("你在当前聊天下无任务")
         elif len(task_ids) > 1:
-            msg = MessageFactory(["你在当前聊天下有多个任务, 请使用 '... finish <task_name> 指明要完成/跳过的任务'\n"])
-            msg_count = 0
-            for task_id in task_ids:
-                msg_count += 1
-                msg += [f"{msg_count}. ", await task_service.describe_task(task_id), " \n"]
+            msg = task_service.render_task_list(tasks, "你在当前聊天下有多个任务, 请使用 '... finish <task_name> 指明要完成/跳过的任务'")
+            await msg.send()
             await rmd_app.finish()
         else:
             await task_service.finish_task(task_ids[0])
-            await (await task_service.describe_task(task_ids[0])).send()
+            msg = await task_service.describe_task(task_ids[0])
+            await task_service.commit()
+            await msg.send()
     else:
         try:
-            task_id = (await task_service.search_task(task_name=result["?task_name"], scope=saa_target)).scalar_one()
+            task_id = await task_service.find_task_id(result["?task_name"], saa_target)
         except NoResultFound:
             await rmd_app.finish(f"当前聊天下无“{result['?task_name']}”任务")
         else:
             await task_service.finish_task(task_id)
-            await ("任务已完成，下一次：" + await task_service.describe_task(task_id)).send()
+            msg = "任务已完成，下一次：" + await task_service.describe_task(task_id)
+            await task_service.commit()
+            await msg.send()
 
 
 @rmd_app.assign("skip")
@@ -114,88 +145,141 @@ async def rmd_skip(result: Arparma, saa_target: SaaTarget, event: Event, task_se
     if not result["?task_name"]:
         logger.info(f"Try skip task in current chat for current user if one and only")
         logger.debug(f"current chat: {saa_target}, current user: {event.get_user_id()}")
-        task_ids = (await task_service.search_task(scope=saa_target, user_id=event.get_user_id(), include_deleted=False)).scalars().all()
+        tasks = await task_service.list_tasks(scope=saa_target, user_id=event.get_user_id())
+        task_ids = [task.id for task in tasks]
 
         if not task_ids:
             await rmd_app.finish("你在当前聊天下无任务")
         elif len(task_ids) > 1:
-            msg = MessageFactory(["你在当前聊天下有多个任务, 请使用 '... skip <task_name> 指明要完成/跳过的任务'\n"])
-            msg_count = 0
-            for task_id in task_ids:
-                msg_count += 1
-                msg += [f"{msg_count}. ", await task_service.describe_task(task_id), " \n"]
+            msg = task_service.render_task_list(tasks, "你在当前聊天下有多个任务, 请使用 '... skip <task_name> 指明要完成/跳过的任务'")
+            await msg.send()
             await rmd_app.finish()
         else:
             await task_service.skip_task(task_ids[0], offset)
-            await (await task_service.describe_task(task_ids[0])).send()
+            msg = await task_service.describe_task(task_ids[0])
+            await task_service.commit()
+            await msg.send()
     else:
         try:
-            task_id = (await task_service.search_task(task_name=result["?task_name"], scope=saa_target)).scalar_one()
+            task_id = await task_service.find_task_id(result["?task_name"], saa_target)
         except NoResultFound:
             await rmd_app.finish(f"当前聊天下无“{result['?task_name']}”任务")
         else:
             await task_service.skip_task(task_id, offset)
-            await ("任务已跳过，下一次：" + await task_service.describe_task(task_id)).send()
+            msg = "任务已跳过，下一次：" + await task_service.describe_task(task_id)
+            await task_service.commit()
+            await msg.send()
 
 
 @rmd_app.assign("due")
 async def rmd_due(result: Arparma, saa_target: SaaTarget, task_service: Annotated[TaskService, Depends(get_task_service)]):
-    task_id = (await task_service.search_task(task_name=result["due.task_name"], scope=saa_target)).scalar_one()
+    task_id = await task_service.find_task_id(result["due.task_name"], saa_target)
     if result["due_shift"]:
         await task_service.set_task(task_id, due_time=result["due_shift"])
     elif result["due_set"]:
         await task_service.set_task(task_id, due_time=result["due_set"])
 
-    msg = await task_service.describe_due_time(task_id)
+    msg = task_service.describe_due_time(await task_service.get_task_snapshot(task_id))
+    await task_service.commit()
     await msg.send()
 
 
 @rmd_app.assign("remind")
 async def rmd_remind(result: Arparma, saa_target: SaaTarget, task_service: Annotated[TaskService, Depends(get_task_service)]):
-    task_id = (await task_service.search_task(task_name=result["remind.task_name"], scope=saa_target)).scalar_one()
-
-    if result["remind_offset"]:
-        await task_service.set_task(task_id, remind_offset=result["remind_offset"])
-    if result["remind_interval"]:
-        await task_service.set_task(task_id, remind_interval=result["remind_interval"])
-
-    msg = await task_service.describe_remind(task_id)
+    task_id = await task_service.find_task_id(result["remind.task_name"], saa_target)
+
+    changes = {
+        attr_name: result[attr_name] for attr_name in ("remind_offset", "remind_interval") if result[attr_name]
+    }
+    # 0 escalates from the first reminder on, so it is not left out like the falsy values above
+    if result.find("remind.no-escalate"):
+        changes["escalate_after"] = None
+    elif result["escalate_after"] is not None:
+        if result["escalate_after"] < 0:
+            await rmd_app.finish("升级提醒次数不能为负数")
+        changes["escalate_after"] = result["escalate_after"]
+    if changes:
+        await task_service.set_task(task_id, **changes)
+
+    msg = task_service.describe_remind(await task_service.get_task_snapshot(task_id))
+    await task_service.commit()
     await msg.send()
 
 
 @rmd_app.assign("recur")
 async def rmd_recur(result: Arparma, saa_target: SaaTarget, task_service: Annotated[TaskService, Depends(get_task_service)]):
-    task_id = (await task_service.search_task(task_name=result["assign.task_name"], scope=saa_target)).scalar_one()
+    task_id = await task_service.find_task_id(result["recur.task_name"], saa_target)
 
-    if result["recur_type"]:
-        await task_service.set_task(task_id, recur_type=result["recur_type"])
-    if result["recur_interval"]:
-        await task_service.set_task(task_id, recur_interval=result["recur_interval"])
+    changes = {
+        attr_name: result[attr_name] for attr_name in ("recur_type", "recur_interval") if result[attr_name]
+    }
+    if changes:
+        await task_service.set_task(task_id, **changes)
 
-    msg = await task_service.describe_recurrence(task_id)
+    msg = task_service.describe_recurrence(await task_service.get_task_snapshot(task_id))
+    await task_service.commit()
     await msg.send()
 
 
 @rmd_app.assign("assign")
 async def rmd_assign(result: Arparma, saa_target: SaaTarget, task_service: Annotated[TaskService, Depends(get_task_service)], assignee_service: AssigneeService = Depends(get_assignee_service)):
-    task_id = (await task_service.search_task(task_name=result["assign.task_name"], scope=saa_target)).scalar_one()
+    task_id = await task_service.find_task_id(result["assign.task_name"], saa_target)
     assignee_ats = result["assign.?assignees"]
 
     if assignee_ats is not None:
         logger.info(f"Try adding / finding corresponding assignees to {assignee_ats}")
         user_ids = [at.target for at in assignee_ats]
         logger.debug(f"User ids: {user_ids}")
-        assignee_ids = [(await assignee_service.add_assignee(user_id)) for user_id in user_ids]
+        assignee_ids = await assignee_service.add_assignees(user_ids)
         logger.debug(f"Assignee ids: {assignee_ids}")
         if result['options.rm']:
             await task_service.remove_assignments(task_id, assignee_ids)
         else:
             await task_service.create_assignments(task_id, assignee_ids)
 
-    msg = await task_service.describe_assignee(task_id)
+    msg = task_service.describe_assignee(await task_service.get_task_snapshot(task_id))
+    await task_service.commit()
     await msg.send()
 
 
+@rmd_app.assign("template")
+async def rmd_template(result: Arparma, saa_target: SaaTarget, task_service: Annotated[TaskService, Depends(get_task_service)]):
+    task_name = result["template.task_name"]
+    overdue = result.find("template.overdue")
+    attr_name = "overdue_template" if overdue else "reminder_template"
+    task_id = await task_service.find_task_id(task_name, saa_target) if task_name else None
+
+    if result.find("template.set") or result.find("template.reset"):
+        template = result["template_text"] if result.find("template.set") else None
+        try:
+            if task_id is not None:
+                await task_service.set_task(task_id, **{attr_name: template})
+            else:
+                await task_service.set_target(saa_target, **{attr_name: template})
+        except TemplateError as e:
+            await rmd_app.finish(f"模板无效：{e}")
+
+    default_template = DEFAULT_OVERDUE_TEMPLATE if overdue else DEFAULT_REMINDER_TEMPLATE
+    if task_id is not None:
+        task = await task_service.get_task_snapshot(task_id)
+        owner, template = f"任务{task_name}", getattr(task, attr_name)
+        chat_template = task.target and getattr(task.target, attr_name)
+    else:
+        target = await task_service.get_target(saa_target)
+        owner, template, chat_template = "当前聊天", target and getattr(target, attr_name), None
+    await task_service.commit()
+
+    msg = f"{owner}的{'超时' if overdue else ''}提醒模板："
+    if template:
+        msg += template
+    elif chat_template:
+        msg += f"{chat_template}（继承自当前聊天）"
+    else:
+        msg += f"{default_template}（默认）"
+    msg += "\n可用占位符：" + "，".join(f"{{{name}}} {description}" for name, description in PLACEHOLDERS.items())
+    await rmd_app.finish(msg)
+
+
 @rmd_app.assign("stat")
 async def rmd_stat(
         result: Arparma,
@@ -203,20 +287,35 @@ async def rmd_stat(
         task_service: Annotated[TaskService, Depends(get_task_service)],
         assignee_service: AssigneeService = Depends(get_assignee_service)
 ):
-    task_id = (await task_service.search_task(task_name=result["stat.task_name"], scope=saa_target)).scalar_one()
-    assignee_targets = [a.target for a in result["stat.?assignees"]]
-    assignee_ids = [(await assignee_service.add_assignee(t)) for t in assignee_targets]
-
-    delays = [(await task_service.stat_delay(task_id, assignee_id)) for assignee_id in assignee_ids]
-    logger.debug(f"Delay stat: {delays}")
-    msg = MessageFactory("延迟统计如下：")
-    for i in range(len(assignee_targets)):
-        msg += [
-            f"\n",
-            Mention(assignee_targets[i]),
-            f" - ",
-            natural_lang_timedelta(delays[i])[0]
-        ]
+    if result.find("stat.rebuild"):
+        record_count = await task_service.rebuild_delay_rollups(saa_target)
+        await task_service.commit()
+        await rmd_app.send(f"已根据{record_count}条完成记录重建当前聊天的延迟统计")
+
+    task_name = result["stat.task_name"]
+    task_id = await task_service.find_task_id(task_name, saa_target) if task_name else None
+    assignee_ats = result["stat.assignees"]
+
+    if assignee_ats:
+        assignee_targets = [a.target for a in assignee_ats]
+        assignee_ids = await assignee_service.add_assignees(assignee_targets)
+        stats = {
+            stat.assignee_id: stat
+            for stat in await task_service.stat_delays(task_id=task_id, scope=saa_target, assignee_ids=assignee_ids)
+        }
+        logger.debug(f"Delay stat: {stats}")
+        msg = MessageFactory("延迟统计如下：")
+        for assignee_id, user_id in zip(assignee_ids, assignee_targets):
+            stat = stats.get(assignee_id, DelayStat(assignee_id, user_id, timedelta(0), timedelta(0), 0.0, 0))
+            msg += ["\n", Mention(user_id), " - ", task_service.describe_delay_stat(stat)]
+    else:
+        stats = await task_service.stat_delays(task_id=task_id, scope=saa_target)
+        logger.debug(f"Delay ranking: {stats}")
+        msg = MessageFactory(f"{'任务' + task_name if task_name else '当前聊天'}拖延排行：")
+        if not stats:
+            msg += "\n暂无完成记录"
+        for rank, stat in enumerate(stats, 1):
+            msg += [f"\n{rank}. ", Mention(stat.user_id), " - ", task_service.describe_delay_stat(stat)]
 
     await msg.send()
     await rmd_app.finish()
@@ -0,0 +1,49 @@
+from typing import Literal
+
+from nonebot import get_plugin_config
+from pydantic import BaseModel, Field
+
+
+class Config(BaseModel):
+    # "queue": a single in-process timer driven by a heap of next fire times, rebuilt from the task rows on startup
+    # so the only scheduling state is in the plugin's database and commits together with the tasks
+    # "apscheduler": one IntervalTrigger job per task in a separate, synchronous SQLite job store
+    yareminder_scheduler: Literal["apscheduler", "queue"] = "queue"
+    # "apscheduler" engine: seconds a reminder may still be sent after its time (None for no limit), whether missed
+    # reminders of a task are sent once, and how many reminders of a task may be sent at the same time
+    yareminder_reminder_misfire_grace_time: int | None = 1
+    yareminder_reminder_coalesce: bool = True
+    yareminder_reminder_max_instances: int = Field(1, ge=1)
+    # Seconds to collect fired reminders before sending them as one message per chat, 0 to disable
+    yareminder_coalesce_window: float = 0
+    # Concurrent reminder sends, and token bucket rate limits (sends per second / burst size)
+    yareminder_send_concurrency: int = Field(8, ge=1)
+    yareminder_platform_rate: float = Field(20, gt=0)
+    yareminder_platform_burst: float = Field(20, ge=1)
+    yareminder_target_rate: float = Field(1, gt=0)
+    yareminder_target_burst: float = Field(5, ge=1)
+    # Cache of (chat, task name) -> task lookups, 0 size to disable
+    yareminder_task_cache_size: int = 1024
+    yareminder_task_cache_ttl: float = 300
+    # (user, chat) pairs remembered as already recorded for escalated reminders, 0 size to check every message
+    yareminder_reachability_cache_size: int = 4096
+    yareminder_reachability_cache_ttl: float = 3600
+    # Days to keep raw completion records before folding them into summaries, None to keep them forever
+    yareminder_record_retention_days: int | None = None
+    # Days before deleted tasks are removed for good with their assignments and records, None to keep them forever
+    yareminder_deleted_task_grace_days: int | None = None
+    # Hours between maintenance runs, and rows handled per maintenance transaction
+    yareminder_maintenance_interval: float = 24
+    yareminder_maintenance_batch_size: int = 500
+    # Metrics exporter, "prometheus" for the text exposition format or a "module:factory" taking the output path,
+    # None to disable metrics altogether; exported every interval seconds, by default to metrics.prom in the data dir
+    yareminder_metrics_exporter: str | None = None
+    yareminder_metrics_path: str | None = None
+    yareminder_metrics_interval: float = 15
+    # Debug: log the SQL statements of every rmd command, flag repeated ones and warn about exceeded per-command
+    # budgets (subcommand name -> statements)
+    yareminder_sql_trace: bool = False
+    yareminder_sql_budgets: dict[str, int] = {}
+
+
+plugin_config = get_plugin_config(Config)
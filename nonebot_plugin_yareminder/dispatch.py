@@ -0,0 +1,165 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Iterable, NamedTuple
+
+from nonebot import logger, require
+
+require("nonebot_plugin_saa")
+from nonebot_plugin_saa import SaaTarget, MessageFactory
+
+from .metrics import metrics
+
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens per second, holding at most `burst` tokens."""
+
+    def __init__(self, rate: float, burst: float):
+        # A bucket that never refills, or never holds a whole token, would block forever
+        if rate <= 0 or burst < 1:
+            raise ValueError(f"Token bucket needs a positive rate and a burst of at least 1, got {rate} / {burst}")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class DispatchStats(NamedTuple):
+    sent: int
+    failed: int
+    elapsed: float
+    latency_avg: float
+    latency_max: float
+
+    @property
+    def throughput(self) -> float:
+        return (self.sent + self.failed) / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.sent} sent, {self.failed} failed in {self.elapsed:.3f}s "
+            f"({self.throughput:.1f}/s), latency avg {self.latency_avg * 1000:.0f}ms "
+            f"max {self.latency_max * 1000:.0f}ms"
+        )
+
+
+class SendDispatcher:
+    """Send messages concurrently under per-platform and per-target rate limits.
+
+    Rate limit tokens are acquired before a concurrency slot is taken, so a chat waiting
+    on its own bucket never holds up sends to other chats.
+    """
+
+    def __init__(
+            self,
+            concurrency: int,
+            platform_rate: float,
+            platform_burst: float,
+            target_rate: float,
+            target_burst: float
+    ):
+        self.concurrency = concurrency
+        self.platform_rate = platform_rate
+        self.platform_burst = platform_burst
+        self.target_rate = target_rate
+        self.target_burst = target_burst
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._platform_buckets: dict[str, TokenBucket] = {}
+        self._target_buckets: dict[SaaTarget, TokenBucket] = {}
+
+    def _platform_bucket(self, target: SaaTarget) -> TokenBucket:
+        bucket = self._platform_buckets.get(target.platform_type)
+        if bucket is None:
+            bucket = self._platform_buckets[target.platform_type] = TokenBucket(self.platform_rate, self.platform_burst)
+        return bucket
+
+    def _target_bucket(self, target: SaaTarget) -> TokenBucket:
+        bucket = self._target_buckets.get(target)
+        if bucket is None:
+            bucket = self._target_buckets[target] = TokenBucket(self.target_rate, self.target_burst)
+        return bucket
+
+    async def _send(self, target: SaaTarget, msg: MessageFactory) -> float:
+        await self._target_bucket(target).acquire()
+        await self._platform_bucket(target).acquire()
+        async with self._semaphore:
+            start = time.perf_counter()
+            await msg.send_to(target=target)
+            return time.perf_counter() - start
+
+    async def dispatch(self, sends: Iterable[tuple[SaaTarget, MessageFactory]]) -> DispatchStats:
+        """Send every `(target, message)` pair, returning the stats of the batch."""
+        sends = list(sends)
+        start = time.perf_counter()
+        results = await asyncio.gather(*(self._send(target, msg) for target, msg in sends), return_exceptions=True)
+        elapsed = time.perf_counter() - start
+
+        latencies = []
+        failed = 0
+        for (target, _), result in zip(sends, results):
+            platform = getattr(target.platform_type, "value", target.platform_type)
+            if isinstance(result, BaseException):
+                failed += 1
+                logger.error(f"Failed to send reminder to {target}: {result}")
+                metrics.inc("yareminder_send_failures_total", platform=platform)
+            else:
+                latencies.append(result)
+                metrics.inc("yareminder_sends_total", platform=platform)
+                metrics.observe("yareminder_send_latency_seconds", result, platform=platform)
+        return DispatchStats(
+            sent=len(latencies),
+            failed=failed,
+            elapsed=elapsed,
+            latency_avg=sum(latencies) / len(latencies) if latencies else 0.0,
+            latency_max=max(latencies, default=0.0)
+        )
+
+
+class ReminderCoalescer:
+    """Collect fired reminders for a short window, then flush them in one batch.
+
+    The window opens with the first reminder added after a flush, so no reminder is
+    delayed by more than `window` seconds. Grouping by chat is left to `flush`.
+    """
+
+    def __init__(self, flush: Callable[[list], Awaitable[Any]], window: float):
+        self._flush = flush
+        self.window = window
+        self._pending: dict[Any, None] = {}
+        self._timer: asyncio.TimerHandle | None = None
+        self._running: set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, task_id):
+        """Queue a reminder. Duplicates within the same window are dropped."""
+        self._pending[task_id] = None
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._on_window_closed)
+
+    async def flush(self):
+        """Flush pending reminders right away."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        task_ids, self._pending = list(self._pending), {}
+        if not task_ids:
+            return
+        logger.debug(f"Flushing {len(task_ids)} coalesced reminders")
+        await self._flush(task_ids)
+
+    def _on_window_closed(self):
+        self._timer = None
+        task = asyncio.ensure_future(self.flush())
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
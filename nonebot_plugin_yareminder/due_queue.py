@@ -0,0 +1,180 @@
+import asyncio
+import heapq
+import itertools
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Iterable
+
+from nonebot import logger
+
+# Re-check the wall clock at least this often, so that clock changes or a suspended
+# host never leave the timer sleeping far past the next fire time.
+MAX_SLEEP_SECONDS = 60.0
+
+
+def next_fire_time(start: datetime, interval: timedelta, after: datetime) -> datetime | None:
+    """Return the first time on the grid `start + k * interval` strictly after `after`.
+
+    Returns None if `interval` is not positive and `start` is not after `after`."""
+    if start > after:
+        return start
+    if interval <= timedelta(0):
+        return None
+    return start + ((after - start) // interval + 1) * interval
+
+
+class _Entry:
+    __slots__ = ("fire_time", "seq", "task_id", "interval", "alive")
+
+    def __init__(self, fire_time: datetime, seq: int, task_id: Any, interval: timedelta):
+        self.fire_time = fire_time
+        self.seq = seq
+        self.task_id = task_id
+        self.interval = interval
+        self.alive = True
+
+    def __lt__(self, other: "_Entry") -> bool:
+        return (self.fire_time, self.seq) < (other.fire_time, other.seq)
+
+
+class DueQueue:
+    """In-process reminder scheduler driven by one timer and a heap of next fire times.
+
+    Every task owns at most one live heap entry. Rescheduling pushes a fresh entry and
+    marks the previous one stale (lazy deletion), so updates are O(log n) in memory.
+    """
+
+    def __init__(self):
+        self._heap: list[_Entry] = []
+        self._entries: dict[Any, _Entry] = {}
+        self._seq = itertools.count()
+        self._stale = 0
+        self._callback: Callable[[Any], Awaitable[Any]] | None = None
+        self._timer: asyncio.TimerHandle | None = None
+        self._armed_for: datetime | None = None
+        self._running: set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, task_id) -> bool:
+        return task_id in self._entries
+
+    @property
+    def running(self) -> bool:
+        return self._callback is not None
+
+    def start(self, callback: Callable[[Any], Awaitable[Any]]):
+        """Start firing `callback(task_id)` for due entries."""
+        self._callback = callback
+        self._arm()
+
+    def shutdown(self):
+        """Stop the timer. Entries are kept so the queue can be restarted."""
+        self._callback = None
+        self._disarm()
+
+    def schedule(self, task_id, start: datetime, interval: timedelta, now: datetime | None = None) -> datetime | None:
+        """(Re)schedule a task to fire at `start` and every `interval` after it.
+
+        Missed fire times are skipped, as APScheduler does for a past `start_date`.
+        Returns the next fire time, or None if the task will never fire again."""
+        self._invalidate(task_id)
+        fire_time = next_fire_time(start, interval, (now or datetime.now()) - timedelta(microseconds=1))
+        if fire_time is None:
+            return None
+        self._push(_Entry(fire_time, next(self._seq), task_id, interval))
+        return fire_time
+
+    def remove(self, task_id) -> bool:
+        """Unschedule a task. Returns False if it was not scheduled."""
+        if not self._invalidate(task_id):
+            return False
+        if self._heap and not self._heap[0].alive:
+            self._arm()
+        return True
+
+    def load(self, items: Iterable[tuple[Any, datetime, timedelta]]) -> int:
+        """Bulk schedule `(task_id, start, interval)` items with a single heapify."""
+        now = datetime.now() - timedelta(microseconds=1)
+        for task_id, start, interval in items:
+            self._invalidate(task_id)
+            fire_time = next_fire_time(start, interval, now)
+            if fire_time is None:
+                continue
+            entry = _Entry(fire_time, next(self._seq), task_id, interval)
+            self._entries[task_id] = entry
+            self._heap.append(entry)
+        heapq.heapify(self._heap)
+        self._arm()
+        return len(self._entries)
+
+    def next_fire_time(self, task_id) -> datetime | None:
+        entry = self._entries.get(task_id)
+        return entry.fire_time if entry else None
+
+    def _push(self, entry: _Entry):
+        self._entries[entry.task_id] = entry
+        heapq.heappush(self._heap, entry)
+        if self._heap[0] is entry:
+            self._arm()
+
+    def _invalidate(self, task_id) -> bool:
+        entry = self._entries.pop(task_id, None)
+        if entry is None:
+            return False
+        entry.alive = False
+        self._stale += 1
+        if self._stale > 1024 and self._stale > len(self._entries):
+            self._heap = [e for e in self._heap if e.alive]
+            heapq.heapify(self._heap)
+            self._stale = 0
+        return True
+
+    def _disarm(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = None
+        self._armed_for = None
+
+    def _arm(self):
+        while self._heap and not self._heap[0].alive:
+            heapq.heappop(self._heap)
+            self._stale -= 1
+        if not self.running or not self._heap:
+            self._disarm()
+            return
+        fire_time = self._heap[0].fire_time
+        if self._timer is not None and self._armed_for == fire_time:
+            return
+        self._disarm()
+        delay = min(max((fire_time - datetime.now()).total_seconds(), 0), MAX_SLEEP_SECONDS)
+        self._timer = asyncio.get_running_loop().call_later(delay, self._fire)
+        self._armed_for = fire_time
+
+    def _fire(self):
+        self._timer = None
+        self._armed_for = None
+        now = datetime.now()
+        while self._heap and self._heap[0].fire_time <= now:
+            entry = heapq.heappop(self._heap)
+            if not entry.alive:
+                self._stale -= 1
+                continue
+            self._dispatch(entry.task_id)
+            fire_time = next_fire_time(entry.fire_time, entry.interval, now)
+            if fire_time is None:
+                del self._entries[entry.task_id]
+                continue
+            entry.fire_time = fire_time
+            entry.seq = next(self._seq)
+            heapq.heappush(self._heap, entry)
+        self._arm()
+
+    def _dispatch(self, task_id):
+        logger.debug(f"Due queue firing task {task_id}")
+        task = asyncio.ensure_future(self._callback(task_id))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+
+due_queue = DueQueue()
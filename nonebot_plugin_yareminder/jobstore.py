@@ -0,0 +1,33 @@
+import pickle
+from typing import Iterable
+
+from apscheduler.job import Job
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.util import datetime_to_utc_timestamp
+
+
+class ReminderJobStore(SQLAlchemyJobStore):
+    """SQLAlchemyJobStore with bulk writes.
+
+    The base class writes every job in its own transaction, which costs a commit (and an fsync)
+    per job when thousands of reminders are reconciled on startup.
+    """
+    # Ids per DELETE, below the bound parameter limit of older SQLite versions
+    chunk_size = 500
+
+    def replace_jobs(self, removed_job_ids: Iterable[str], jobs: Iterable[Job]):
+        """Remove jobs by id, and add or replace jobs, in one transaction with one INSERT"""
+        rows = [
+            {
+                "id": job.id,
+                "next_run_time": datetime_to_utc_timestamp(job.next_run_time),
+                "job_state": pickle.dumps(job.__getstate__(), self.pickle_protocol),
+            }
+            for job in jobs
+        ]
+        deleted_ids = [*removed_job_ids, *(row["id"] for row in rows)]
+        with self.engine.begin() as connection:
+            for i in range(0, len(deleted_ids), self.chunk_size):
+                connection.execute(self.jobs_t.delete().where(self.jobs_t.c.id.in_(deleted_ids[i:i + self.chunk_size])))
+            if rows:
+                connection.execute(self.jobs_t.insert(), rows)
@@ -0,0 +1,159 @@
+import importlib
+import math
+import os
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Protocol
+
+from nonebot import logger
+
+from .config import plugin_config
+from .sql_trace import CommandTrace
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LAG_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+STATEMENT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+# name: (type, help, histogram buckets)
+METRICS = {
+    "yareminder_reminder_lag_seconds": (
+        "histogram", "Delay between the scheduled reminder time and the reminder being sent", LAG_BUCKETS
+    ),
+    "yareminder_sends_total": ("counter", "Reminder messages sent", None),
+    "yareminder_send_failures_total": ("counter", "Reminder messages that failed to send", None),
+    "yareminder_send_latency_seconds": ("histogram", "Time spent in a single message send", LATENCY_BUCKETS),
+    "yareminder_command_duration_seconds": ("histogram", "Wall time of a rmd command", LATENCY_BUCKETS),
+    "yareminder_command_db_seconds": ("histogram", "Time a rmd command spent in SQL statements", LATENCY_BUCKETS),
+    "yareminder_command_statements": ("histogram", "SQL statements issued by a rmd command", STATEMENT_BUCKETS),
+    "yareminder_db_statements_total": ("counter", "SQL statements issued by rmd commands", None),
+}
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """In-process counters and histograms, keyed by metric name and label values"""
+    enabled = True
+
+    def __init__(self):
+        self.counters: dict[tuple[str, tuple], float] = {}
+        self.histograms: dict[tuple[str, tuple], Histogram] = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(METRICS[name][2])
+        histogram.observe(value)
+
+    def end_command(self, trace: CommandTrace | None):
+        """Record a finished rmd command from its SQL trace"""
+        if trace is None:
+            return
+        statements = len(trace.statements)
+        self.observe("yareminder_command_duration_seconds", time.perf_counter() - trace.started, command=trace.command)
+        self.observe("yareminder_command_db_seconds", trace.db_time, command=trace.command)
+        self.observe("yareminder_command_statements", statements, command=trace.command)
+        self.inc("yareminder_db_statements_total", statements, command=trace.command)
+
+
+class NullMetrics:
+    """Stand-in used when metrics are disabled, every call is a no-op"""
+    enabled = False
+
+    def inc(self, name: str, value: float = 1, **labels):
+        pass
+
+    def observe(self, name: str, value: float, **labels):
+        pass
+
+    def end_command(self, trace: CommandTrace | None):
+        pass
+
+
+class Exporter(Protocol):
+    def export(self, metrics: Metrics) -> None: ...
+
+
+def escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels: tuple, **extra) -> str:
+    items = [*labels, *extra.items()]
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{escape_label_value(value)}"' for key, value in items) + "}"
+
+
+def format_value(value: float) -> str:
+    return "+Inf" if value == math.inf else repr(float(value))
+
+
+class PrometheusTextExporter:
+    """Write the metrics in the Prometheus text exposition format, e.g. for the node exporter textfile collector"""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+
+    def render(self, metrics: Metrics) -> str:
+        lines = []
+        for name, (metric_type, help_text, _) in METRICS.items():
+            samples = []
+            if metric_type == "counter":
+                for (key_name, labels), value in sorted(metrics.counters.items()):
+                    if key_name == name:
+                        samples.append(f"{name}{format_labels(labels)} {format_value(value)}")
+            else:
+                for (key_name, labels), histogram in sorted(metrics.histograms.items(), key=lambda item: item[0]):
+                    if key_name != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip((*histogram.buckets, math.inf), histogram.counts):
+                        cumulative += count
+                        samples.append(
+                            f"{name}_bucket{format_labels(labels, le=format_value(bound))} {cumulative}"
+                        )
+                    samples.append(f"{name}_sum{format_labels(labels)} {format_value(histogram.sum)}")
+                    samples.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+            if samples:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}", *samples]
+        return "\n".join(lines) + "\n"
+
+    def export(self, metrics: Metrics):
+        # Written aside and renamed, so that a scrape never reads a partial file
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_text(self.render(metrics), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+
+def create_exporter(spec: str, path: str | Path) -> Exporter:
+    """Create the exporter named by the config, "prometheus" or a "module:factory" taking the metrics path"""
+    if spec == "prometheus":
+        return PrometheusTextExporter(path)
+    module_name, _, attr = spec.partition(":")
+    factory = getattr(importlib.import_module(module_name), attr)
+    logger.info(f"Using metrics exporter {spec}")
+    return factory(path)
+
+
+# The statements of the commands are collected by sql_trace.sql_tracer
+metrics: Metrics | NullMetrics = Metrics() if plugin_config.yareminder_metrics_exporter else NullMetrics()
@@ -0,0 +1,111 @@
+"""normalize platform targets
+
+迁移 ID: 12385a92366d
+父迁移: ff967c217fa2
+创建时间: 2026-10-17 03:16:40.964856
+
+"""
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '12385a92366d'
+down_revision: str | Sequence[str] | None = 'ff967c217fa2'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+task_table = sa.table(
+    'nonebot_plugin_yareminder_taskmodel',
+    sa.column('target_id', sa.Integer()),
+    sa.column('platform_target_serial', sa.String()),
+)
+target_table = sa.table(
+    'nonebot_plugin_yareminder_targetmodel',
+    sa.column('id', sa.Integer()),
+    sa.column('serial', sa.String()),
+)
+
+
+def canonical_serial(serial: str) -> str:
+    # must match models.serialize_target
+    return json.dumps(json.loads(serial), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def legacy_serial(serial: str) -> str:
+    # pydantic dumps platform_type first; the remaining field order is not recoverable
+    data = json.loads(serial)
+    return json.dumps({"platform_type": data.pop("platform_type"), **data}, separators=(",", ":"), ensure_ascii=False)
+
+
+def upgrade(name: str = "") -> None:
+    if name:
+        return
+    op.create_table('nonebot_plugin_yareminder_targetmodel',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('serial', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_nonebot_plugin_yareminder_targetmodel')),
+    sa.UniqueConstraint('serial'),
+    info={'bind_key': 'nonebot_plugin_yareminder'}
+    )
+    with op.batch_alter_table('nonebot_plugin_yareminder_taskmodel', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('target_id', sa.Integer(), nullable=True))
+
+    conn = op.get_bind()
+    legacy_serials = conn.execute(
+        sa.select(task_table.c.platform_target_serial)
+        .where(task_table.c.platform_target_serial.is_not(None))
+        .distinct()
+    ).scalars().all()
+    target_ids: dict[str, int] = {}
+    for serial in legacy_serials:
+        canonical = canonical_serial(serial)
+        if canonical not in target_ids:
+            conn.execute(sa.insert(target_table).values(serial=canonical))
+            target_ids[canonical] = conn.execute(
+                sa.select(target_table.c.id).where(target_table.c.serial == canonical)
+            ).scalar_one()
+        conn.execute(
+            sa.update(task_table)
+            .where(task_table.c.platform_target_serial == serial)
+            .values(target_id=target_ids[canonical])
+        )
+
+    with op.batch_alter_table('nonebot_plugin_yareminder_taskmodel', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_nonebot_plugin_yareminder_taskmodel_scope'))
+        batch_op.create_index('ix_nonebot_plugin_yareminder_taskmodel_scope', ['target_id', 'is_deleted', 'due_time'], unique=False)
+        batch_op.drop_constraint(batch_op.f('unique_name_in_the_same_session_with_undeleted_tasks'), type_='unique')
+        batch_op.create_unique_constraint('unique_name_in_the_same_session_with_undeleted_tasks', ['name', 'target_id', 'is_deleted', 'deleted_at'])
+        batch_op.create_foreign_key(batch_op.f('fk_nonebot_plugin_yareminder_taskmodel_target_id_nonebot_plugin_yareminder_targetmodel'), 'nonebot_plugin_yareminder_targetmodel', ['target_id'], ['id'])
+        batch_op.drop_column('platform_target_serial')
+
+
+def downgrade(name: str = "") -> None:
+    if name:
+        return
+    with op.batch_alter_table('nonebot_plugin_yareminder_taskmodel', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('platform_target_serial', sa.VARCHAR(), nullable=True))
+
+    conn = op.get_bind()
+    for target_id, serial in conn.execute(sa.select(target_table.c.id, target_table.c.serial)).all():
+        conn.execute(
+            sa.update(task_table)
+            .where(task_table.c.target_id == target_id)
+            .values(platform_target_serial=legacy_serial(serial))
+        )
+
+    with op.batch_alter_table('nonebot_plugin_yareminder_taskmodel', schema=None) as batch_op:
+        batch_op.drop_constraint(batch_op.f('fk_nonebot_plugin_yareminder_taskmodel_target_id_nonebot_plugin_yareminder_targetmodel'), type_='foreignkey')
+        batch_op.drop_constraint('unique_name_in_the_same_session_with_undeleted_tasks', type_='unique')
+        batch_op.create_unique_constraint(batch_op.f('unique_name_in_the_same_session_with_undeleted_tasks'), ['name', 'platform_target_serial', 'is_deleted', 'deleted_at'])
+        batch_op.drop_index('ix_nonebot_plugin_yareminder_taskmodel_scope')
+        batch_op.create_index(batch_op.f('ix_nonebot_plugin_yareminder_taskmodel_scope'), ['platform_target_serial', 'is_deleted', 'due_time'], unique=False)
+        batch_op.drop_column('target_id')
+
+    op.drop_table('nonebot_plugin_yareminder_targetmodel')
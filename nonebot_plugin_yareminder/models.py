@@ -2,12 +2,13 @@ from .utils import RecurType
 
 from nonebot import require
 from datetime import datetime, timedelta
+import json
 import uuid
 
 require("nonebot_plugin_orm")
 from nonebot_plugin_orm import Model
-from sqlalchemy import ForeignKey, Column, Integer, String, DateTime, Interval, JSON, Boolean, Enum, UniqueConstraint
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import ForeignKey, Column, Integer, Float, String, DateTime, Interval, JSON, Boolean, Enum, UniqueConstraint, Index
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.ext.declarative import declared_attr
 
 require("nonebot_plugin_saa")
@@ -35,6 +36,23 @@ class SoftDeleteMixin:
         self.deleted_at = None
 
 
+def serialize_target(platform_target: PlatformTarget) -> str:
+    """Canonical serialization of a platform target, independent of pydantic field order"""
+    return json.dumps(platform_target.model_dump(mode="json"), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+class TargetModel(Model):
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    serial: Mapped[str] = mapped_column(String, unique=True)
+    # message templates of the reminders in this chat, None for the defaults
+    reminder_template: Mapped[str] = mapped_column(String, nullable=True)
+    overdue_template: Mapped[str] = mapped_column(String, nullable=True)
+
+    @property
+    def platform_target(self):
+        return PlatformTarget.deserialize(self.serial)
+
+
 class TaskModel(Model, SoftDeleteMixin):
     # trival attributes:
     # name, description, recur_type, recur_interval: no hook on change
@@ -49,26 +67,42 @@ class TaskModel(Model, SoftDeleteMixin):
     recur_interval: Mapped[timedelta] = mapped_column(Interval, nullable=True)
     recur_type: Mapped[RecurType] = mapped_column(Enum(RecurType))
     apscheduler_job_id: Mapped[str] = mapped_column(String, nullable=True)
-    platform_target_serial: Mapped[str] = mapped_column(String, nullable=True)
+    target_id: Mapped[int] = mapped_column(ForeignKey(TargetModel.__tablename__ + ".id"), nullable=True)
     current_assignment_order: Mapped[int] = mapped_column(Integer, nullable=True, default=None)
+    # message templates of the reminders of this task, None to use the ones of the chat
+    reminder_template: Mapped[str] = mapped_column(String, nullable=True)
+    overdue_template: Mapped[str] = mapped_column(String, nullable=True)
+    # after this many ignored reminders, also remind the assignee in the other chats they were seen in
+    escalate_after: Mapped[int] = mapped_column(Integer, nullable=True, default=None)
+    # reminders sent since the task was last finished or skipped
+    ignored_reminders: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+
+    target: Mapped[TargetModel] = relationship(lazy="joined", viewonly=True)
+    # read-only view for eager loading, assignments are always written through AssignmentModel
+    assignments: Mapped[list["AssignmentModel"]] = relationship(
+        order_by="AssignmentModel.order", viewonly=True
+    )
 
     __table_args__ = (
         UniqueConstraint(
             'name',
-            'platform_target_serial',
+            'target_id',
             'is_deleted',
             'deleted_at',
             name='unique_name_in_the_same_session_with_undeleted_tasks'
         ),
+        # scope listing (`rmd ls`, reminders for a chat); lookups by name use the unique constraint above
+        Index('ix_nonebot_plugin_yareminder_taskmodel_scope', 'target_id', 'is_deleted', 'due_time'),
     )
 
     @property
     def platform_target(self):
-        return PlatformTarget.deserialize(self.platform_target_serial)
+        return self.target.platform_target
 
-    @platform_target.setter
-    def platform_target(self, platform_target: PlatformTarget):
-        self.platform_target_serial = platform_target.model_dump()
+    @property
+    def assignee_user_ids(self) -> list[str]:
+        """User ids of the assignees in order, requires `assignments` to be loaded"""
+        return [assignment.assignee.user_id for assignment in self.assignments]
 
     def __repr__(self) -> str:
         return (
@@ -86,6 +120,14 @@ class AssigneeModel(Model):
     user_id: Mapped[str] = mapped_column(String, unique=True)
 
 
+class UserTargetModel(Model):
+    """Chats a user was seen in, so that escalated reminders can reach them elsewhere"""
+    # user_id leads the primary key, finding the chats of a user is an index lookup
+    user_id: Mapped[str] = mapped_column(String, primary_key=True)
+    target_id: Mapped[int] = mapped_column(ForeignKey(TargetModel.__tablename__ + ".id"), primary_key=True)
+    seen_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+
+
 class AssignmentModel(Model):
     id: Mapped[uuid.UUID] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()),
                                           nullable=False)
@@ -93,9 +135,13 @@ class AssignmentModel(Model):
     assignee_id: Mapped[uuid.UUID] = mapped_column(ForeignKey(AssigneeModel.__tablename__ + ".id"))
     order: Mapped[int] = mapped_column(Integer)
 
+    assignee: Mapped[AssigneeModel] = relationship(viewonly=True)
+
     __table_args__ = (
         UniqueConstraint('task_id', 'order', name='different_seq for task'),
         UniqueConstraint('task_id', 'assignee_id', name='can only assign once'),
+        # task lookup by assignee; lookups by task use the unique constraints above
+        Index('ix_nonebot_plugin_yareminder_assignmentmodel_assignee', 'assignee_id'),
     )
 
 
@@ -103,6 +149,50 @@ class RecordModel(Model):
     id: Mapped[uuid.UUID] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()),
                                           nullable=False)
     task_id: Mapped[uuid.UUID] = mapped_column(ForeignKey(TaskModel.__tablename__ + ".id"))
-    assignee_id: Mapped[uuid.UUID] = mapped_column(ForeignKey(TaskModel.__tablename__ + ".id"), nullable=True)
+    assignee_id: Mapped[uuid.UUID] = mapped_column(ForeignKey(AssigneeModel.__tablename__ + ".id"), nullable=True)
     due_time: Mapped[datetime] = mapped_column(DateTime)
     finish_time: Mapped[datetime] = mapped_column(DateTime)
+    # finish_time - due_time in seconds, stored so that aggregates need no dialect specific date functions
+    delay_seconds: Mapped[float] = mapped_column(Float, nullable=True)
+
+    __table_args__ = (
+        Index('ix_nonebot_plugin_yareminder_recordmodel_task_assignee', 'task_id', 'assignee_id'),
+        Index('ix_nonebot_plugin_yareminder_recordmodel_finish_time', 'finish_time'),
+    )
+
+
+class DelayRollupMixin:
+    """Incrementally maintained delay aggregates, updated in the same transaction as the records"""
+    delay_sum: Mapped[float] = mapped_column(Float, default=0)
+    delay_max: Mapped[float] = mapped_column(Float, nullable=True)
+    count: Mapped[int] = mapped_column(Integer, default=0)
+    on_time_count: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class DelayRollupModel(Model, DelayRollupMixin):
+    task_id: Mapped[uuid.UUID] = mapped_column(ForeignKey(TaskModel.__tablename__ + ".id"), primary_key=True)
+    assignee_id: Mapped[uuid.UUID] = mapped_column(ForeignKey(AssigneeModel.__tablename__ + ".id"), primary_key=True)
+
+
+class MonthlyDelayRollupModel(Model, DelayRollupMixin):
+    target_id: Mapped[int] = mapped_column(ForeignKey(TargetModel.__tablename__ + ".id"), primary_key=True)
+    assignee_id: Mapped[uuid.UUID] = mapped_column(ForeignKey(AssigneeModel.__tablename__ + ".id"), primary_key=True)
+    # "YYYY-MM" of the finish time
+    month: Mapped[str] = mapped_column(String(7), primary_key=True)
+
+
+class RecordSummaryModel(Model, DelayRollupMixin):
+    """Records past the retention period, folded per task, assignee and month of the finish time"""
+    task_id: Mapped[uuid.UUID] = mapped_column(ForeignKey(TaskModel.__tablename__ + ".id"), primary_key=True)
+    assignee_id: Mapped[uuid.UUID] = mapped_column(ForeignKey(AssigneeModel.__tablename__ + ".id"), primary_key=True)
+    # "YYYY-MM" of the finish time
+    month: Mapped[str] = mapped_column(String(7), primary_key=True)
+
+
+class VacuumedRecordSummaryModel(Model, DelayRollupMixin):
+    """Records and summaries of vacuumed tasks, folded per chat, assignee and month of the finish time,
+    so that the chat level stats can still be rebuilt after the tasks are gone"""
+    target_id: Mapped[int] = mapped_column(ForeignKey(TargetModel.__tablename__ + ".id"), primary_key=True)
+    assignee_id: Mapped[uuid.UUID] = mapped_column(ForeignKey(AssigneeModel.__tablename__ + ".id"), primary_key=True)
+    # "YYYY-MM" of the finish time
+    month: Mapped[str] = mapped_column(String(7), primary_key=True)
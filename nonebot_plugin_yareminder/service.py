@@ -1,17 +1,36 @@
 import uuid
+import asyncio
+import time
+from collections import Counter
+from functools import cache
 from datetime import datetime, timedelta
-from typing import Union, Set, Iterable
+from typing import Union, Set, Iterable, NamedTuple, Sequence, Callable, TYPE_CHECKING
 
+from apscheduler.job import Job
 from apscheduler.triggers.interval import IntervalTrigger
+from apscheduler.util import convert_to_datetime
 from nonebot import require, logger
 from collections.abc import AsyncGenerator
 
-from .models import TaskModel, AssigneeModel, AssignmentModel, RecordModel
-from .utils import natural_lang_date, natural_lang_timedelta, RecurType
+from .config import plugin_config
+from .cache import TaskLookupCache
+from .dispatch import ReminderCoalescer, SendDispatcher, DispatchStats
+from .due_queue import due_queue, next_fire_time
+from .metrics import metrics
+from .models import (
+    TaskModel, AssigneeModel, AssignmentModel, RecordModel, TargetModel, DelayRollupModel, MonthlyDelayRollupModel,
+    RecordSummaryModel, VacuumedRecordSummaryModel, UserTargetModel, serialize_target
+)
+from .utils import natural_lang_timedelta, date_renderer, DateRenderer, RecurType
+from .template import compile_template, DEFAULT_REMINDER_TEMPLATE, DEFAULT_OVERDUE_TEMPLATE
+
+if TYPE_CHECKING:
+    from .jobstore import ReminderJobStore
 
 require("nonebot_plugin_apscheduler")
 from nonebot_plugin_apscheduler import scheduler
 from apscheduler.jobstores.base import JobLookupError
+from apscheduler.schedulers.base import STATE_RUNNING
 
 require("nonebot_plugin_saa")
 from nonebot_plugin_saa import SaaTarget, MessageFactory, Mention, Text
@@ -19,8 +38,31 @@ from nonebot_plugin_saa import SaaTarget, MessageFactory, Mention, Text
 require("nonebot_plugin_orm")
 from nonebot_plugin_orm import get_session, async_scoped_session, AsyncSession, get_scoped_session
 from sqlalchemy.future import select
-from sqlalchemy.exc import NoResultFound, IntegrityError
-from sqlalchemy import func, and_
+from sqlalchemy.exc import NoResultFound
+from sqlalchemy import func, false, case, delete, update, insert as sa_insert
+from sqlalchemy.orm import joinedload
+
+# In-process cache of SaaTarget -> TargetModel.id, targets are never deleted so entries never go stale
+target_id_cache: dict[SaaTarget, int] = {}
+
+# (user id, chat) pairs this process recently recorded in UserTargetModel, or found not to be an assignee, so
+# that only the first message of a user in a chat costs a database round trip. The pairs map to themselves, the
+# cache is only used as a bounded set; it is cleared when assignees are added
+reachability_seen = TaskLookupCache(
+    plugin_config.yareminder_reachability_cache_size, plugin_config.yareminder_reachability_cache_ttl
+)
+
+# Read-through cache of (target id, task name) -> undeleted task id, invalidated by every task write
+task_lookup_cache = TaskLookupCache(plugin_config.yareminder_task_cache_size, plugin_config.yareminder_task_cache_ttl)
+
+
+@cache
+def task_snapshot_options() -> tuple:
+    """Eager load options for rendering a task with its ordered assignees in the same query.
+
+    Built on first use, creating them configures all mappers, which would otherwise happen at import.
+    """
+    return (joinedload(TaskModel.assignments).joinedload(AssignmentModel.assignee),)
 
 
 def ensure_provided(ensure_args: list, not_none: int):
@@ -28,11 +70,110 @@ def ensure_provided(ensure_args: list, not_none: int):
         raise ValueError(f"Exactly {not_none} in specified range of optional argument(s) must be provided")
 
 
+def fold_delay(
+        aggregates: dict[tuple, list], key: tuple, delay_sum: float, delay_max: float, count: int, on_time_count: int
+):
+    """Fold delays into a [delay_sum, delay_max, count, on_time_count] aggregate"""
+    aggregate = aggregates.setdefault(key, [0.0, delay_max, 0, 0])
+    aggregate[0] += delay_sum
+    aggregate[1] = max(aggregate[1], delay_max)
+    aggregate[2] += count
+    aggregate[3] += on_time_count
+
+
+def reminder_trigger(start: datetime, interval: timedelta) -> IntervalTrigger:
+    return IntervalTrigger(
+        seconds=int(interval.total_seconds()),
+        jitter=int(interval.total_seconds() * 0.02),
+        start_date=start
+    )
+
+
+# Set on every reminder job rather than left to the job defaults of the shared scheduler
+REMINDER_JOB_OPTIONS = {
+    "misfire_grace_time": plugin_config.yareminder_reminder_misfire_grace_time,
+    "coalesce": plugin_config.yareminder_reminder_coalesce,
+    "max_instances": plugin_config.yareminder_reminder_max_instances,
+}
+
+
+def add_reminder_job(job_id: str, task_id: uuid.UUID, task_name: str, start: datetime, interval: timedelta):
+    """Add or replace the apscheduler reminder job of a task"""
+    scheduler.add_job(
+        TaskService.send_reminder,
+        jobstore='nonebot-plugin-yareminder-jobstore',
+        trigger=reminder_trigger(start, interval),
+        args=[task_id],
+        id=job_id,
+        name=f"Reminder wakeup timer for task {task_name} ({task_id})",
+        replace_existing=True,
+        **REMINDER_JOB_OPTIONS
+    )
+    logger.debug(f"Scheduled reminder for task {task_id}: {job_id}")
+
+
+def create_reminder_job(
+        job_id: str, task_id: uuid.UUID, task_name: str, start: datetime, interval: timedelta, now: datetime
+) -> Job:
+    """The reminder job of a task as `add_reminder_job` adds it, for bulk writes to the job store"""
+    trigger = reminder_trigger(start, interval)
+    return Job(
+        scheduler,
+        id=job_id,
+        func=TaskService.send_reminder,
+        trigger=trigger,
+        executor="default",
+        args=[task_id],
+        kwargs={},
+        name=f"Reminder wakeup timer for task {task_name} ({task_id})",
+        next_run_time=trigger.get_next_fire_time(None, now),
+        **REMINDER_JOB_OPTIONS
+    )
+
+
+def is_reminder_job_current(job: Job, task_id: uuid.UUID, start: datetime, interval: timedelta) -> bool:
+    """Whether a reminder job still fires on the schedule of its task"""
+    trigger = job.trigger
+    # Pending jobs of a scheduler that is not started yet have no next run time, paused ones have None
+    return (
+            getattr(job, "next_run_time", start) is not None
+            and list(job.args) == [task_id]
+            and isinstance(trigger, IntervalTrigger)
+            and trigger.interval == timedelta(seconds=int(interval.total_seconds()))
+            and trigger.start_date == convert_to_datetime(start, trigger.timezone, "start_date")
+            and all(getattr(job, option, value) == value for option, value in REMINDER_JOB_OPTIONS.items())
+    )
+
+
+def reminder_lag(task: TaskModel, now: datetime) -> float | None:
+    """Seconds since the latest scheduled reminder time of a task, None before the first one"""
+    start = task.due_time + task.remind_offset
+    if start > now:
+        return None
+    upcoming = next_fire_time(start, task.remind_interval, now)
+    scheduled = upcoming - task.remind_interval if upcoming is not None else start
+    return (now - scheduled).total_seconds()
+
+
+class DelayStat(NamedTuple):
+    assignee_id: uuid.UUID
+    user_id: str
+    total: timedelta
+    average: timedelta
+    on_time_rate: float
+    count: int
+
+
 class Service:
+    """A unit of work over one session, committed once when the service is closed or `commit` is called"""
     session: AsyncSession
 
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, on_close: Callable[["Service"], None] | None = None):
         self.session = session
+        # Called with the service once it is closed, e.g. for a harness checking the commit count of a command
+        self.on_close = on_close
+        self.commit_count = 0
+        self.post_commit_hooks: list[Callable[[], None]] = []
 
     async def __aenter__(self):
         # Optionally start a transaction if necessary
@@ -40,14 +181,157 @@ class Service:
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if exc_type:
-            await self.session.rollback()  # Rollback if an error occurred
-        else:
-            await self.session.commit()  # Commit if no exception
-        await self.session.close()  # Close the session
+        try:
+            if exc_type:
+                await self.rollback()  # Rollback if an error occurred
+            else:
+                await self.commit()  # Commit if no exception
+        finally:
+            await self.session.close()  # Close the session
+            logger.debug(f"{type(self).__name__} closed after {self.commit_count} commit(s)")
+            if self.on_close is not None:
+                self.on_close(self)
+
+    def after_commit(self, hook: Callable[[], None]):
+        """Defer a side effect outside the database until the current transaction is committed"""
+        self.post_commit_hooks.append(hook)
+
+    async def commit(self):
+        """Commit the current transaction if any, then apply the deferred side effects in order"""
+        if self.session.in_transaction():
+            await self.session.commit()
+            self.commit_count += 1
+        hooks, self.post_commit_hooks = self.post_commit_hooks, []
+        for hook in hooks:
+            try:
+                hook()
+            except Exception as e:
+                # Timers are reconciled against the tasks on startup, so a failed hook is not fatal
+                logger.exception(f"Post commit hook {hook} failed: {e}")
+
+    async def rollback(self):
+        """Rollback the current transaction and drop the deferred side effects"""
+        await self.session.rollback()
+        self.post_commit_hooks.clear()
 
 
 class TaskService(Service):
+    # Platform target resolution
+
+    async def resolve_target_id(self, target: SaaTarget, create: bool = False) -> int | None:
+        """Resolve a SaaTarget to the id of its TargetModel row, through an in-process cache.
+
+        Returns None for an unknown target unless `create` is set."""
+        target_id = target_id_cache.get(target)
+        if target_id is not None:
+            return target_id
+        serial = serialize_target(target)
+        target_id = (
+            await self.session.execute(select(TargetModel.id).where(TargetModel.serial == serial))
+        ).scalar_one_or_none()
+        if target_id is None:
+            if not create:
+                return None
+            new_target = TargetModel(serial=serial)
+            self.session.add(new_target)
+            await self.session.flush()
+            # not cached until committed, the next lookup will find it
+            return new_target.id
+        target_id_cache[target] = target_id
+        return target_id
+
+    async def resolve_target_ids(self, targets: Iterable[SaaTarget]) -> list[int]:
+        """Resolve known SaaTargets to TargetModel ids, unknown targets are left out"""
+        target_ids = []
+        for target in targets:
+            target_id = await self.resolve_target_id(target)
+            if target_id is not None:
+                target_ids.append(target_id)
+        return target_ids
+
+    @staticmethod
+    async def record_reachability(user_id: str, target: SaaTarget) -> None:
+        """Remember that the user can be reached in the chat, for escalated reminders.
+
+        Only assignees are recorded, reminders are never escalated to anyone else.
+        """
+        key = (user_id, target)
+        if reachability_seen.get(key) is not None:
+            return
+        reachability_seen.put(key, key)
+        try:
+            async with TaskService(get_session()) as task_service:
+                assignee = await task_service.session.scalar(
+                    select(AssigneeModel.id).where(AssigneeModel.user_id == user_id)
+                )
+                if assignee is None:
+                    return
+                target_id = await task_service.resolve_target_id(target, create=True)
+                if await task_service.session.get(UserTargetModel, (user_id, target_id)) is None:
+                    task_service.session.add(UserTargetModel(user_id=user_id, target_id=target_id))
+        except Exception as e:
+            # e.g. an IntegrityError of a concurrent insert, checked again on the next message in the chat
+            reachability_seen.invalidate(key)
+            logger.warning(f"Unable to record the chat of user {user_id}: {e}")
+
+    async def escalate_reminders(
+            self, tasks: Iterable[TaskModel], dates: DateRenderer | None = None
+    ) -> list[tuple[SaaTarget, MessageFactory]]:
+        """Count the reminders just sent for the tasks as ignored, and escalate the tasks ignored too often.
+
+        A task with `escalate_after` set that was already reminded that many times since it was last
+        finished or skipped also reminds its current assignee in the other chats they were seen in.
+        The chats of all escalated assignees are fetched with one lookup on the user id index.
+        """
+        escalated: list[tuple[TaskModel, str]] = []
+        for task in tasks:
+            if task.escalate_after is None:
+                continue
+            user_ids = task.assignee_user_ids
+            if user_ids and task.ignored_reminders >= task.escalate_after:
+                escalated.append((task, user_ids[task.current_assignment_order]))
+            task.ignored_reminders += 1
+        if not escalated:
+            return []
+
+        user_targets: dict[str, list[TargetModel]] = {}
+        rows = (
+            await self.session.execute(
+                select(UserTargetModel.user_id, TargetModel)
+                .join(TargetModel, TargetModel.id == UserTargetModel.target_id)
+                .where(UserTargetModel.user_id.in_({user_id for _, user_id in escalated}))
+            )
+        ).all()
+        for user_id, target in rows:
+            user_targets.setdefault(user_id, []).append(target)
+
+        sends = []
+        dates = dates or date_renderer()
+        for task, user_id in escalated:
+            for target in user_targets.get(user_id, ()):
+                if target.id == task.target_id:
+                    continue
+                msg = self.get_notification_message(task, dates)
+                msg += f"（第{task.ignored_reminders}次提醒）"
+                sends.append((target.platform_target, msg))
+        if sends:
+            logger.info(f"Escalated {len(escalated)} ignored reminders to {len(sends)} other chats")
+        return sends
+
+    def invalidate_lookup(self, task_id: uuid.UUID | None = None, key: tuple[int, str] | None = None):
+        """Drop a task from the lookup cache now, and again once committed.
+
+        A concurrent command may look the task up between the write and the commit, and would
+        cache the row as it was before the write."""
+        def invalidate():
+            if task_id is not None:
+                task_lookup_cache.invalidate_task(task_id)
+            if key is not None:
+                task_lookup_cache.invalidate(key)
+
+        invalidate()
+        self.after_commit(invalidate)
+
     # Task related CRUD
 
     # TODO: a more general search function
@@ -60,12 +344,13 @@ class TaskService(Service):
     ):
         """Search for tasks with `task_name` in a scope of SaaTarget"""
         logger.debug(
-            f"Searching tasks with the following filters: task_name={task_name}, scope={scope.model_dump_json()}, user_id={user_id}, include_deleted={include_deleted}")
+            f"Searching tasks with the following filters: task_name={task_name}, scope={scope}, user_id={user_id}, include_deleted={include_deleted}")
         stmt = select(TaskModel.id)
         if task_name is not None:
             stmt = stmt.where(TaskModel.name == task_name)
         if scope is not None:
-            stmt = stmt.where(TaskModel.platform_target_serial == scope.model_dump_json())
+            target_id = await self.resolve_target_id(scope)
+            stmt = stmt.where(TaskModel.target_id == target_id if target_id is not None else false())
         if not include_deleted:
             stmt = stmt.where(TaskModel.is_deleted == False)
         if user_id is not None:
@@ -79,15 +364,74 @@ class TaskService(Service):
         results = await self.session.execute(stmt)
         return results
 
+    async def find_task_id(self, task_name: str, scope: SaaTarget) -> uuid.UUID:
+        """Resolve the undeleted task named `task_name` in a scope, through the lookup cache.
+
+        Raises NoResultFound or MultipleResultsFound like `scalar_one`."""
+        target_id = await self.resolve_target_id(scope)
+        if target_id is None:
+            raise NoResultFound(f"No task named {task_name} in {scope}")
+        key = (target_id, task_name)
+        task_id = task_lookup_cache.get(key)
+        if task_id is not None:
+            return task_id
+        task_id = (
+            await self.session.execute(
+                select(TaskModel.id)
+                .where(
+                    TaskModel.target_id == target_id,
+                    TaskModel.name == task_name,
+                    TaskModel.is_deleted == False
+                )
+            )
+        ).scalar_one()
+        task_lookup_cache.put(key, task_id)
+        return task_id
+
+    async def list_tasks(
+            self,
+            scope: SaaTarget,
+            user_id: str | None = None
+    ) -> list[TaskModel]:
+        """Load every undeleted task in a scope with their assignees, in one query regardless of task count"""
+        target_id = await self.resolve_target_id(scope)
+        if target_id is None:
+            return []
+        stmt = (
+            select(TaskModel)
+            .options(*task_snapshot_options())
+            .where(
+                TaskModel.target_id == target_id,
+                TaskModel.is_deleted == False
+            )
+            .order_by(TaskModel.due_time)
+            .execution_options(populate_existing=True)
+        )
+        if user_id is not None:
+            stmt = stmt.where(
+                TaskModel.id.in_(
+                    select(AssignmentModel.task_id)
+                    .join(AssigneeModel, AssigneeModel.id == AssignmentModel.assignee_id)
+                    .where(AssigneeModel.user_id == user_id)
+                )
+            )
+        return list((await self.session.execute(stmt)).unique().scalars().all())
+
     async def __get_task(
             self,
             task_id: Union[uuid.UUID, None] = None,
             include_deleted: bool = False
     ):
         """Fetch a task by ID, """
-        stmt = select(TaskModel)
         if task_id:
-            stmt = stmt.where(TaskModel.id == task_id)
+            # Through the identity map, so that the flows of one unit of work select the task only once
+            task = await self.session.get(TaskModel, task_id)
+            if task is not None and (include_deleted or not task.is_deleted):
+                return task
+            logger.error(f"Task with ID {task_id} not found.")
+            raise NoResultFound(f"No {'undeleted ' if not include_deleted else ''}task has id {task_id}")
+
+        stmt = select(TaskModel)
         if not include_deleted:
             stmt = stmt.where(TaskModel.is_deleted == False)
 
@@ -98,6 +442,27 @@ class TaskService(Service):
             logger.error(f"Task with ID {task_id} not found.")
             raise NoResultFound(f"No {'undeleted ' if not include_deleted else ''}task has id {task_id}")
 
+    async def get_task_snapshot(
+            self,
+            task_id: uuid.UUID,
+            include_deleted: bool = False
+    ) -> TaskModel:
+        """Load a task together with its ordered assignees in one query, for rendering"""
+        stmt = (
+            select(TaskModel)
+            .options(*task_snapshot_options())
+            .where(TaskModel.id == task_id)
+            .execution_options(populate_existing=True)
+        )
+        if not include_deleted:
+            stmt = stmt.where(TaskModel.is_deleted == False)
+
+        try:
+            return (await self.session.execute(stmt)).unique().scalar_one()
+        except NoResultFound:
+            logger.error(f"Task with ID {task_id} not found.")
+            raise NoResultFound(f"No {'undeleted ' if not include_deleted else ''}task has id {task_id}")
+
     async def create_task(
             self,
             name: str,
@@ -109,6 +474,8 @@ class TaskService(Service):
             platform_target: SaaTarget
     ) -> uuid.UUID:
         """Create task"""
+        target_id = await self.resolve_target_id(platform_target, create=True)
+        self.invalidate_lookup(key=(target_id, name))
         created_task = TaskModel(
             name=name,
             due_time=due_time,
@@ -116,23 +483,21 @@ class TaskService(Service):
             remind_interval=remind_interval,
             recur_interval=recur_interval,
             recur_type=recur_type,
-            platform_target_serial=platform_target.model_dump_json(),
+            target_id=target_id,
             current_assignment_order=None
         )
         self.session.add(created_task)
-        await self.session.commit()
-        await self.session.refresh(created_task)
-        await self.refresh_reminder(created_task.id)
-        task_id = created_task.id
+        await self.session.flush()
+        await self.schedule_reminder(created_task.id)
 
-        return task_id
+        return created_task.id
 
     async def delete_task(self, task_id: uuid.UUID) -> None:
         """Delete given task or task with given id"""
+        self.invalidate_lookup(task_id)
         await self.remove_reminder(task_id)
         task = await self.__get_task(task_id=task_id)
         task.soft_delete()
-        await self.session.commit()
 
     async def set_task(
             self,
@@ -141,7 +506,9 @@ class TaskService(Service):
     ) -> None:
         """Set attributes of a task"""
         logger.debug(f"Setting values: {kwargs}")
+        self.invalidate_lookup(task_id)
         task = await self.__get_task(task_id)
+        reschedule = False
         for attr_name, attr_value in kwargs.items():
             if not hasattr(task, attr_name):
                 logger.error(f"Setting non-existing attr {attr_name} of task {task.id} to {attr_value}")
@@ -155,15 +522,40 @@ class TaskService(Service):
                         setattr(task, attr_name, attr_value)
                     else:
                         raise ValueError("Incorrect value type for due_time")
-                    await self.refresh_reminder(task.id)
+                    reschedule = True
                 case "remind_offset" | "remind_interval":
                     setattr(task, attr_name, attr_value)
-                    await self.refresh_reminder(task.id)
+                    reschedule = True
+                case "escalate_after":
+                    setattr(task, attr_name, attr_value)
+                    # the count starts over with the new policy
+                    task.ignored_reminders = 0
+                case "reminder_template" | "overdue_template":
+                    if attr_value is not None:
+                        # raises TemplateError before anything is stored
+                        compile_template(attr_value)
+                    setattr(task, attr_name, attr_value)
                 case _:
                     setattr(task, attr_name, attr_value)
 
-        await self.session.commit()
-        await self.session.refresh(task)
+        if reschedule:
+            await self.refresh_reminder(task.id)
+
+    async def get_target(self, scope: SaaTarget) -> TargetModel | None:
+        """Fetch the TargetModel of a chat, None if no task was ever created in it"""
+        target_id = await self.resolve_target_id(scope)
+        return await self.session.get(TargetModel, target_id) if target_id is not None else None
+
+    async def set_target(self, scope: SaaTarget, **kwargs) -> None:
+        """Set chat level settings, only the message templates for now"""
+        logger.debug(f"Setting values of chat {scope}: {kwargs}")
+        target = await self.session.get(TargetModel, await self.resolve_target_id(scope, create=True))
+        for attr_name, attr_value in kwargs.items():
+            if attr_name not in ("reminder_template", "overdue_template"):
+                raise ValueError(f"None existing attr: {attr_name}")
+            if attr_value is not None:
+                compile_template(attr_value)
+            setattr(target, attr_name, attr_value)
 
     # Assignee lookup & assignment CRUD
     async def get_assignee_user_ids(self, task_id: uuid.UUID):
@@ -183,10 +575,19 @@ class TaskService(Service):
         logger.debug(f"Assignees for task {task_id}: {assignees}")
         return assignees
 
-    async def shift_current_assignee_order(self, task_id: uuid.UUID, offset: int):
+    async def count_assignees(self, task_id: uuid.UUID) -> int:
+        """Count the assignees of a task."""
+        return (
+            await self.session.execute(
+                select(func.count()).select_from(AssignmentModel).where(AssignmentModel.task_id == task_id)
+            )
+        ).scalar_one()
+
+    async def shift_current_assignee_order(self, task_id: uuid.UUID, offset: int, assignee_count: int | None = None):
         """Shift by offset to another from current assignee"""
         logger.info(f"Shifting task current by {offset}")
-        assignee_count = len(await self.get_assignee_user_ids(task_id))
+        if assignee_count is None:
+            assignee_count = await self.count_assignees(task_id)
         if assignee_count == 0:
             logger.warning("Shifting task current with no assignee")
         task = await self.__get_task(task_id)
@@ -194,164 +595,406 @@ class TaskService(Service):
         task.current_assignment_order = (task.current_assignment_order + offset) % assignee_count
         logger.debug(f"Assignee count: {assignee_count}, current order: {task.current_assignment_order}")
 
-        await self.session.commit()
+    async def stat_delays(
+            self,
+            task_id: uuid.UUID | None = None,
+            scope: SaaTarget | None = None,
+            assignee_ids: Iterable[uuid.UUID] | None = None
+    ) -> list[DelayStat]:
+        """Stat the delays of all assignees from the rollups in one grouped query, ranked by total delay.
+
+        Filter by a task or by all tasks (including deleted ones) in a scope, and/or by assignees."""
+        logger.info(f"Stating the delayed time of assignees: task={task_id}, scope={scope}")
+        if task_id is not None:
+            rollup = DelayRollupModel
+            filters = [DelayRollupModel.task_id == task_id]
+        elif scope is not None:
+            rollup = MonthlyDelayRollupModel
+            target_id = await self.resolve_target_id(scope)
+            filters = [MonthlyDelayRollupModel.target_id == target_id if target_id is not None else false()]
+        else:
+            rollup = DelayRollupModel
+            filters = []
+        if assignee_ids is not None:
+            filters.append(rollup.assignee_id.in_(list(assignee_ids)))
+
+        total = func.sum(rollup.delay_sum)
+        stmt = (
+            select(rollup.assignee_id, AssigneeModel.user_id, total, func.sum(rollup.count), func.sum(rollup.on_time_count))
+            .join(AssigneeModel, AssigneeModel.id == rollup.assignee_id)
+            .where(*filters)
+            .group_by(rollup.assignee_id, AssigneeModel.user_id)
+            .order_by(total.desc())
+        )
+        return [
+            DelayStat(
+                assignee_id=assignee_id,
+                user_id=user_id,
+                total=timedelta(seconds=total),
+                average=timedelta(seconds=total / count),
+                on_time_rate=on_time_count / count,
+                count=count
+            )
+            for assignee_id, user_id, total, count, on_time_count in await self.session.execute(stmt)
+            if count
+        ]
 
     async def stat_delay(self, task_id: uuid.UUID, assignee_id: uuid.UUID) -> timedelta:
-        """Stat the delay of a user"""
-        logger.info(f"Stating the delayed time of a user in a task")
+        """Stat the total delay of an assignee on a task"""
+        stats = await self.stat_delays(task_id=task_id, assignee_ids=[assignee_id])
+        return stats[0].total if stats else timedelta(0)
+
+    async def roll_up_delay(self, task: TaskModel, assignee_id: uuid.UUID, finish_time: datetime, delay: float):
+        """Fold a new record into the delay rollups, in the current transaction.
+
+        One upsert per rollup with SQL side increments, so that concurrent finishes neither overwrite
+        each other nor both insert the first row of an assignee."""
+        on_time = 1 if delay <= 0 else 0
+        dialect = self.session.get_bind(DelayRollupModel).dialect.name
+        for model, key in (
+                (DelayRollupModel, {"task_id": task.id, "assignee_id": assignee_id}),
+                (MonthlyDelayRollupModel, {
+                    "target_id": task.target_id, "assignee_id": assignee_id, "month": finish_time.strftime("%Y-%m")
+                }),
+        ):
+            values = {**key, "delay_sum": delay, "delay_max": delay, "count": 1, "on_time_count": on_time}
+            increments = {
+                "delay_sum": model.delay_sum + delay,
+                "delay_max": case((model.delay_max < delay, delay), else_=model.delay_max),
+                "count": model.count + 1,
+                "on_time_count": model.on_time_count + on_time,
+            }
+            if dialect in ("sqlite", "postgresql"):
+                if dialect == "sqlite":
+                    from sqlalchemy.dialects.sqlite import insert
+                else:
+                    from sqlalchemy.dialects.postgresql import insert
+                statement = insert(model).values(values).on_conflict_do_update(index_elements=list(key), set_=increments)
+            elif dialect in ("mysql", "mariadb"):
+                from sqlalchemy.dialects.mysql import insert
+                statement = insert(model).values(values).on_duplicate_key_update(increments)
+            else:
+                # No portable upsert, concurrent first finishes of an assignee may still conflict
+                rollup = await self.session.get(model, key)
+                if rollup is None:
+                    self.session.add(model(**values))
+                else:
+                    for attr_name, increment in increments.items():
+                        setattr(rollup, attr_name, increment)
+                continue
+            await self.session.execute(statement)
+
+    async def rebuild_delay_rollups(self, scope: SaaTarget | None = None) -> int:
+        """Recompute the delay rollups of a scope (or all scopes) from raw records, returns the record count"""
+        logger.info(f"Rebuilding delay rollups for scope {scope}")
+        rollup_filters, monthly_filters, scope_filters, vacuumed_filters = [], [], [], []
+        if scope is not None:
+            target_id = await self.resolve_target_id(scope)
+            if target_id is None:
+                return 0
+            rollup_filters.append(
+                DelayRollupModel.task_id.in_(select(TaskModel.id).where(TaskModel.target_id == target_id))
+            )
+            monthly_filters.append(MonthlyDelayRollupModel.target_id == target_id)
+            scope_filters.append(TaskModel.target_id == target_id)
+            vacuumed_filters.append(VacuumedRecordSummaryModel.target_id == target_id)
+        await self.session.execute(delete(DelayRollupModel).where(*rollup_filters))
+        await self.session.execute(delete(MonthlyDelayRollupModel).where(*monthly_filters))
+
+        rollups: dict[tuple, list] = {}
+        monthly_rollups: dict[tuple, list] = {}
+        records = await self.session.stream(
+            select(
+                RecordModel.task_id, RecordModel.assignee_id, TaskModel.target_id,
+                RecordModel.finish_time, RecordModel.delay_seconds
+            )
+            .join(TaskModel, TaskModel.id == RecordModel.task_id)
+            .where(RecordModel.assignee_id.is_not(None), *scope_filters)
+        )
+        record_count = 0
+        async for task_id, assignee_id, target_id, finish_time, delay in records:
+            record_count += 1
+            on_time = 1 if delay <= 0 else 0
+            fold_delay(rollups, (task_id, assignee_id), delay, delay, 1, on_time)
+            fold_delay(
+                monthly_rollups, (target_id, assignee_id, finish_time.strftime("%Y-%m")), delay, delay, 1, on_time
+            )
 
-        total_time_diff = (await self.session.execute(
+        # Records past the retention period only survive as summaries
+        summaries = await self.session.stream(
             select(
-                func.sum(
-                    func.julianday(RecordModel.finish_time) - func.julianday(RecordModel.due_time)
-                )
-            ).where(
-                and_(
-                    RecordModel.task_id == task_id,
-                    RecordModel.assignee_id == assignee_id
-                )
+                RecordSummaryModel.task_id, RecordSummaryModel.assignee_id, TaskModel.target_id,
+                RecordSummaryModel.month, RecordSummaryModel.delay_sum, RecordSummaryModel.delay_max,
+                RecordSummaryModel.count, RecordSummaryModel.on_time_count
             )
-        )).scalar()
+            .join(TaskModel, TaskModel.id == RecordSummaryModel.task_id)
+            .where(*scope_filters)
+        )
+        async for task_id, assignee_id, target_id, month, *aggregate in summaries:
+            record_count += aggregate[2]
+            fold_delay(rollups, (task_id, assignee_id), *aggregate)
+            fold_delay(monthly_rollups, (target_id, assignee_id, month), *aggregate)
 
-        return timedelta(days=total_time_diff) if total_time_diff else timedelta(0)
+        # Vacuumed tasks only survive in the chat level stats
+        vacuumed = await self.session.stream(
+            select(
+                VacuumedRecordSummaryModel.target_id, VacuumedRecordSummaryModel.assignee_id,
+                VacuumedRecordSummaryModel.month, VacuumedRecordSummaryModel.delay_sum,
+                VacuumedRecordSummaryModel.delay_max, VacuumedRecordSummaryModel.count,
+                VacuumedRecordSummaryModel.on_time_count
+            )
+            .where(*vacuumed_filters)
+        )
+        async for target_id, assignee_id, month, *aggregate in vacuumed:
+            record_count += aggregate[2]
+            fold_delay(monthly_rollups, (target_id, assignee_id, month), *aggregate)
+
+        self.session.add_all(
+            DelayRollupModel(
+                task_id=task_id, assignee_id=assignee_id,
+                delay_sum=delay_sum, delay_max=delay_max, count=count, on_time_count=on_time_count
+            )
+            for (task_id, assignee_id), (delay_sum, delay_max, count, on_time_count) in rollups.items()
+        )
+        self.session.add_all(
+            MonthlyDelayRollupModel(
+                target_id=target_id, assignee_id=assignee_id, month=month,
+                delay_sum=delay_sum, delay_max=delay_max, count=count, on_time_count=on_time_count
+            )
+            for (target_id, assignee_id, month), (delay_sum, delay_max, count, on_time_count)
+            in monthly_rollups.items()
+        )
+        logger.info(
+            f"Rebuilt {len(rollups)} task rollups and {len(monthly_rollups)} monthly rollups from {record_count} records"
+        )
+        return record_count
 
     async def create_assignments(self, task_id: uuid.UUID, assignee_ids: Iterable[uuid.UUID]) -> None:
-        """Create assignments."""
+        """Append assignees to the rotation of a task, in one transaction"""
+        assignee_ids = list(assignee_ids)
         logger.info(f"Assigning task {task_id} to assinees {assignee_ids}")
+        self.invalidate_lookup(task_id)
         task = await self.__get_task(task_id)
 
-        assignee_count = len(await self.get_assignee_user_ids(task_id))
-        if not task.current_assignment_order:
+        assigned = set(
+            (
+                await self.session.execute(
+                    select(AssignmentModel.assignee_id).where(AssignmentModel.task_id == task_id)
+                )
+            ).scalars()
+        )
+        logger.debug(f"Existing assignee count is {len(assigned)} for task {task_id}")
+        new_assignee_ids = [assignee_id for assignee_id in dict.fromkeys(assignee_ids) if assignee_id not in assigned]
+        if len(new_assignee_ids) < len(set(assignee_ids)):
+            logger.warning(f"Some assignees are already assigned to task {task_id}")
+
+        if task.current_assignment_order is None:
             logger.debug(f"Initialize task's current assignment order to 0")
             task.current_assignment_order = 0
-        await self.session.commit()
-        await self.session.refresh(task)
-        logger.debug(f"Existing assignee count is {assignee_count} for task {task_id}")
-
-        for assignee_id in assignee_ids:
-            new_assignment = AssignmentModel(
-                task_id=task_id,
-                assignee_id=assignee_id,
-                order=assignee_count
+        if new_assignee_ids:
+            await self.session.execute(
+                sa_insert(AssignmentModel),
+                [
+                    {"id": str(uuid.uuid4()), "task_id": task_id, "assignee_id": assignee_id, "order": order}
+                    for order, assignee_id in enumerate(new_assignee_ids, start=len(assigned))
+                ]
             )
-            self.session.add(new_assignment)
-            try:
-                await self.session.commit()
-            except IntegrityError as e:
-                await self.session.rollback()
-                logger.warning(f"Assignee {assignee_id} already assigned to task {task_id}")
-            else:
-                logger.debug(f"Assignees added for task {task_id}: {assignee_id} [{assignee_count}]")
-                assignee_count += 1
+        logger.debug(f"Assignees added for task {task_id}: {new_assignee_ids}")
 
     async def remove_assignments(self, task_id: uuid.UUID, assignee_ids: Iterable[uuid.UUID]):
-        """Try remove assignment from given task"""
+        """Remove assignees from the rotation of a task and close the gaps, in one transaction"""
+        self.invalidate_lookup(task_id)
         task = await self.__get_task(task_id)
+        assignee_ids = set(assignee_ids)
 
         assignments = (
             await self.session.execute(
-                select(AssignmentModel)
-                .where(AssignmentModel.id.in_(assignee_ids))
+                select(AssignmentModel.id, AssignmentModel.assignee_id, AssignmentModel.order)
+                .where(AssignmentModel.task_id == task_id)
                 .order_by(AssignmentModel.order)
             )
-        ).scalars().all()
-
+        ).all()
         logger.debug(f"Assignments for task {task.name}: {assignments}")
 
-        offset = 0
-        assignee_ids = list(assignee_ids)
-
-        for i in range(0, len(assignments)):
-            if assignments[i].assignee_id in assignee_ids:
-                assignee_ids.remove(assignments[i].assignee_id)
-                self.session.delete(assignments[i])
-                offset += 1
-                if task.current_assignment_order >= i: task.current_assignment_order -= 1
-            else:
-                assignments[i].order -= offset
+        removed = [assignment for assignment in assignments if assignment.assignee_id in assignee_ids]
+        kept = [assignment for assignment in assignments if assignment.assignee_id not in assignee_ids]
+        if len(removed) < len(assignee_ids):
+            logger.warning(
+                f"These assignees is not assigned to task {task.id}: "
+                f"{assignee_ids - {assignment.assignee_id for assignment in removed}}"
+            )
+        if not removed:
+            return
 
-        if assignee_ids:
-            logger.warning(f"These assignees is not assigned to task {task.id}: {assignee_ids} ")
+        await self.session.execute(
+            delete(AssignmentModel).where(AssignmentModel.id.in_([assignment.id for assignment in removed]))
+        )
+        # Ascending executemany, every row moves down into an order that is already vacated
+        renumbered = [
+            {"id": assignment.id, "order": order}
+            for order, assignment in enumerate(kept) if assignment.order != order
+        ]
+        if renumbered:
+            await self.session.execute(update(AssignmentModel), renumbered)
+
+        # The current assignee keeps its turn, a removed current assignee passes it to the next one
+        if task.current_assignment_order is not None:
+            current = task.current_assignment_order - sum(
+                1 for assignment in removed if assignment.order < task.current_assignment_order
+            )
+            task.current_assignment_order = current % len(kept) if kept else 0
 
-    # APScheduler wakeup timer related
+    # Reminder wakeup timer related
 
-    # Note: as apscheduler handles its own persist database, this operation is not atomic: 
-    # a partial fail could lead to wild wakeup jobs waking up a task more frequently than 
-    # expected, or trying to wake up a task no longer exist. The purge method in utils could
-    # fix all such errors but is relatively expensive.
+    # Note: as apscheduler handles its own persist database, this operation is not atomic:
+    # a partial fail could lead to wild wakeup jobs waking up a task more frequently than
+    # expected, or trying to wake up a task no longer exist. reconcile_reminders fixes all
+    # such jobs against the task table on startup.
+    # With the "queue" scheduler engine, timers live in memory and are rebuilt from the task
+    # table on startup, so there is nothing to purge.
 
     @staticmethod
-    async def send_reminder(task_id: uuid.UUID):
-        """Send a reminder notification for the task."""
+    async def send_reminder(task_id: uuid.UUID, coalesce: bool = True):
+        """Send a reminder notification for the task.
+
+        With a coalesce window configured, the reminder is buffered and sent together with
+        the other reminders of the same chat that fire within the window."""
+        if coalesce and plugin_config.yareminder_coalesce_window > 0:
+            reminder_coalescer.add(task_id)
+            return
         async with TaskService(get_session()) as task_service:
             logger.info(f"Sending notification for task {task_id}")
             try:
-                task = await task_service.__get_task(task_id)
+                task = await task_service.get_task_snapshot(task_id)
             except NoResultFound:
-                logger.error(f"No active task with id {task_id}. Possibly unmanaged jobs exist, please purge.")
+                logger.error(f"No active task with id {task_id}. Possibly an orphan job, removed on the next startup.")
                 return
-            msg = await task_service.get_notification_message(task_id)
-            try:
-                await msg.send_to(target=task.platform_target)
+            if metrics.enabled and (lag := reminder_lag(task, datetime.now())) is not None:
+                metrics.observe("yareminder_reminder_lag_seconds", lag)
+            msg = task_service.get_notification_message(task)
+            sends = [(task.platform_target, msg)] + await task_service.escalate_reminders([task])
+            stats = await send_dispatcher.dispatch(sends)
+            if not stats.failed:
                 logger.debug(f"Sent reminder for task {task.id}")
-            except Exception as e:
-                logger.error(f"Failed to send reminder for task {task.id}: {e}")
-                return
 
     @staticmethod
-    async def send_reminder_for_all(scope: Set[SaaTarget]):
-        """Send a reminder notification for all ongoing task."""
-        session = get_session()
-        scope_serialized = {saa_target.model_dump_json() for saa_target in scope}
-        task_ids = (
-            await session.execute(
-                select(TaskModel.id)
-                .where(
-                    TaskModel.is_deleted == False,
-                    TaskModel.platform_target_serial.in_(scope_serialized)
+    async def send_coalesced_reminders(task_ids: Iterable[uuid.UUID]):
+        """Send reminders for the tasks as one combined message per chat."""
+        async with TaskService(get_session()) as task_service:
+            tasks = (
+                await task_service.session.execute(
+                    select(TaskModel)
+                    .options(*task_snapshot_options())
+                    .where(
+                        TaskModel.id.in_(task_ids),
+                        TaskModel.is_deleted == False
+                    )
                 )
-            )
-        ).scalars().all()
-        for task_id in task_ids:
-            await TaskService.send_reminder(task_id)
+            ).unique().scalars().all()
+            grouped: dict[int, list[TaskModel]] = {}
+            now = datetime.now()
+            for task in sorted(tasks, key=lambda t: t.due_time):
+                grouped.setdefault(task.target_id, []).append(task)
+                if metrics.enabled and (lag := reminder_lag(task, now)) is not None:
+                    metrics.observe("yareminder_reminder_lag_seconds", lag)
+
+            sends = []
+            dates = date_renderer()
+            for target_tasks in grouped.values():
+                msg = MessageFactory()
+                for task in target_tasks:
+                    if msg:
+                        msg += "\n"
+                    msg += task_service.get_notification_message(task, dates)
+                sends.append((target_tasks[0].platform_target, msg))
+            sends += await task_service.escalate_reminders(tasks, dates)
+        stats = await send_dispatcher.dispatch(sends)
+        logger.info(f"Coalesced {len(tasks)} reminders into {len(sends)} messages: {stats}")
+
+    @staticmethod
+    async def send_reminder_for_all(scope: Set[SaaTarget]) -> DispatchStats:
+        """Send a reminder notification for all ongoing task, concurrently."""
+        async with TaskService(get_session()) as task_service:
+            target_ids = await task_service.resolve_target_ids(scope)
+            tasks = (
+                await task_service.session.execute(
+                    select(TaskModel)
+                    .options(*task_snapshot_options())
+                    .where(
+                        TaskModel.is_deleted == False,
+                        TaskModel.target_id.in_(target_ids)
+                    )
+                )
+            ).unique().scalars().all()
+            dates = date_renderer()
+            sends = [(task.platform_target, task_service.get_notification_message(task, dates)) for task in tasks]
+        stats = await send_dispatcher.dispatch(sends)
+        logger.info(f"Sent reminders for {len(sends)} tasks: {stats}")
+        return stats
+
+    @staticmethod
+    async def load_due_queue() -> int:
+        """Fill the in-process due queue from all undeleted tasks and start its timer."""
+        async with TaskService(get_session()) as task_service:
+            rows = (
+                await task_service.session.execute(
+                    select(TaskModel.id, TaskModel.due_time, TaskModel.remind_offset, TaskModel.remind_interval)
+                    .where(TaskModel.is_deleted == False)
+                )
+            ).all()
+        count = due_queue.load(
+            (task_id, due_time + remind_offset, remind_interval)
+            for task_id, due_time, remind_offset, remind_interval in rows
+            if due_time is not None
+        )
+        due_queue.start(TaskService.send_reminder)
+        logger.info(f"Due queue loaded with {count} reminders")
+        return count
 
     async def schedule_reminder(self, task_id: uuid.UUID):
-        """Schedule the APScheduler reminder job for the task."""
+        """Schedule the reminder for the task with the configured scheduler engine, once the transaction commits."""
         task = await self.__get_task(task_id)
-        trigger = IntervalTrigger(
-            seconds=int(task.remind_interval.total_seconds()),
-            jitter=int(task.remind_interval.total_seconds() * 0.02),
-            start_date=task.due_time + task.remind_offset
-        )
-        job = scheduler.add_job(
-            TaskService.send_reminder,
-            jobstore='nonebot-plugin-yareminder-jobstore',
-            trigger=trigger,
-            args=[task.id],
-            name=f"Reminder wakeup timer for task {task.name} ({task.id})"
-        )
-        task.apscheduler_job_id = job.id
-        await self.session.commit()
-        await self.session.refresh(task)
-        logger.debug(f"Scheduled reminder for task {task.id}: {job.id}")
+        start, interval = task.due_time + task.remind_offset, task.remind_interval
+        if plugin_config.yareminder_scheduler == "queue":
+            def schedule():
+                next_fire = due_queue.schedule(task_id, start, interval)
+                logger.debug(f"Queued reminder for task {task_id}, next fire at {next_fire}")
+
+            self.after_commit(schedule)
+            return
+
+        # The job id is decided up front, so that it is committed together with the task
+        job_id = uuid.uuid4().hex
+        task.apscheduler_job_id = job_id
+        task_name = task.name
+        self.after_commit(lambda: add_reminder_job(job_id, task_id, task_name, start, interval))
 
     async def remove_reminder(self, task_id: uuid.UUID):
-        """Remove the APScheduler reminder job."""
+        """Remove the reminder job of the task, once the transaction commits."""
         task = await self.__get_task(task_id)
-        if task.apscheduler_job_id:
-            try:
-                scheduler.remove_job(task.apscheduler_job_id, 'nonebot-plugin-yareminder-jobstore')
-                logger.debug(f"Removed reminder for task {task.id}")
-            except JobLookupError:
-                logger.warning(f"Job {task.apscheduler_job_id} not found for task {task.id}")
+        if plugin_config.yareminder_scheduler == "queue":
+            def remove():
+                if not due_queue.remove(task_id):
+                    logger.warning(f"Task {task_id} has no queued reminder")
+
+            self.after_commit(remove)
+        elif task.apscheduler_job_id:
+            job_id = task.apscheduler_job_id
             task.apscheduler_job_id = None
-            await self.session.commit()
-            await self.session.refresh(task)
+
+            def remove_job():
+                try:
+                    scheduler.remove_job(job_id, 'nonebot-plugin-yareminder-jobstore')
+                    logger.debug(f"Removed reminder for task {task_id}")
+                except JobLookupError:
+                    logger.warning(f"Job {job_id} not found for task {task_id}")
+
+            self.after_commit(remove_job)
         else:
             logger.warning(f"Task {task_id} has no job")
 
     async def refresh_reminder(self, task_id: uuid.UUID):
-        """Refresh the reminder by removing and rescheduling the APScheduler job."""
+        """Refresh the reminder by removing and rescheduling it."""
         logger.debug(f"Refreshing reminder for task {task_id}")
 
         await self.remove_reminder(task_id)
@@ -359,25 +1002,44 @@ class TaskService(Service):
 
     # All human-readable related message generation
 
-    async def get_notification_message(self, task_id: uuid.UUID) -> MessageFactory:
-        """Generate the notification message for the task."""
-        msg = MessageFactory()
-        task: TaskModel = await self.__get_task(task_id)
+    @staticmethod
+    def get_template(task: TaskModel, overdue: bool) -> str:
+        """The template text of a task's reminders: its own, else its chat's, else the default"""
+        if overdue:
+            return (
+                task.overdue_template or (task.target and task.target.overdue_template) or DEFAULT_OVERDUE_TEMPLATE
+            )
+        return task.reminder_template or (task.target and task.target.reminder_template) or DEFAULT_REMINDER_TEMPLATE
 
-        assignee_user_ids = await self.get_assignee_user_ids(task_id)
-        if assignee_user_ids:
-            msg += [Mention(user_id=assignee_user_ids[task.current_assignment_order]), " "]
+    def get_notification_message(self, task: TaskModel, dates: DateRenderer | None = None) -> MessageFactory:
+        """Generate the notification message for a task snapshot."""
         now = datetime.now()
-        if now < task.due_time:
-            msg += ["请记得", await self.describe_due_time(task_id), str(task.name)]
-        else:
-            msg += [f"{task.name}应", await self.describe_due_time(task_id), "哦"]
+        overdue = now >= task.due_time
+        template = compile_template(self.get_template(task, overdue))
+
+        # Only the placeholders the template uses are computed
+        values = {}
+        for field in template.fields:
+            match field:
+                case "name":
+                    values[field] = str(task.name)
+                case "due":
+                    values[field] = [self.describe_due_time(task, dates)]
+                case "assignee" | "position":
+                    assignee_user_ids = task.assignee_user_ids
+                    if not assignee_user_ids:
+                        values[field] = ""
+                    elif field == "assignee":
+                        values[field] = [Mention(user_id=assignee_user_ids[task.current_assignment_order]), Text(" ")]
+                    else:
+                        values[field] = f"{task.current_assignment_order + 1}/{len(assignee_user_ids)}"
+                case "overdue":
+                    values[field] = natural_lang_timedelta(now - task.due_time)[0] if overdue else ""
 
-        return msg
+        return template.render(values)
 
-    async def describe_recurrence(self, task_id: uuid.UUID) -> Text:
+    def describe_recurrence(self, task: TaskModel) -> Text:
         """Return a Text that describes the recurrence """
-        task = await self.__get_task(task_id)
         if task.recur_interval:
             diff_str, negative = natural_lang_timedelta(task.recur_interval)
         match task.recur_type:
@@ -388,25 +1050,23 @@ class TaskService(Service):
             case RecurType.Regular:
                 return Text(f"每{diff_str}重复")
 
-    async def describe_due_time(self, task_id: uuid.UUID) -> Text:
+    def describe_due_time(self, task: TaskModel, dates: DateRenderer | None = None) -> Text:
         """Return a Text that describes the recurrence """
-        task = await self.__get_task(task_id)
-        return Text(f"在{natural_lang_date(task.due_time)}前完成")
+        return Text(f"在{(dates or date_renderer()).render(task.due_time)}前完成")
 
-    async def describe_remind(self, task_id: uuid.UUID) -> Text:
+    def describe_remind(self, task: TaskModel) -> Text:
         """Returns a Text that describes the reminder offset"""
-        task = await self.__get_task(task_id)
         offset_str, offset_negative = natural_lang_timedelta(task.remind_offset)
         interval_str, interval_negative = natural_lang_timedelta(task.remind_interval)
-        return Text(f"{'提前' if offset_negative else '延后'}{offset_str}，间隔{interval_str}提醒")
+        escalation = f"，{task.escalate_after}次未完成后到其他会话提醒" if task.escalate_after is not None else ""
+        return Text(f"{'提前' if offset_negative else '延后'}{offset_str}，间隔{interval_str}提醒{escalation}")
 
-    async def describe_assignee(self, task_id: uuid.UUID) -> MessageFactory:
+    def describe_assignee(self, task: TaskModel) -> MessageFactory:
         """Returns a MessageFactory that describes the assignees and current one"""
         msg = MessageFactory()
-        task = await self.__get_task(task_id)
-        user_ids = await self.get_assignee_user_ids(task.id)
+        user_ids = task.assignee_user_ids
         if user_ids:
-            logger.debug(f"Exist assignees for task {task_id}")
+            logger.debug(f"Exist assignees for task {task.id}")
             msg += "依次由 "
             for user_id in user_ids:
                 msg += Mention(user_id)
@@ -414,28 +1074,50 @@ class TaskService(Service):
             msg += " 完成，当前轮到 "
             msg += Mention(user_ids[task.current_assignment_order])
         else:
-            logger.debug(f"No assignees for task {task_id}")
+            logger.debug(f"No assignees for task {task.id}")
             msg += "无指派"
         return msg
 
-    async def describe_task(
-            self,
-            task_id: uuid.UUID
-    ):
-        logger.debug(f"Generating description of task: {task_id}")
-        task: TaskModel = await self.__get_task(task_id, include_deleted=True)
+    def describe_delay_stat(self, stat: DelayStat) -> Text:
+        """Returns a Text that describes the delay statistics of an assignee"""
+        if not stat.count:
+            return Text("暂无完成记录")
+        total_str, total_negative = natural_lang_timedelta(stat.total)
+        average_str, average_negative = natural_lang_timedelta(stat.average)
+        return Text(
+            f"共{stat.count}次，累计{'提前' if total_negative else '拖延'}{total_str or '0秒'}，"
+            f"平均{'提前' if average_negative else '拖延'}{average_str or '0秒'}，准时率{stat.on_time_rate:.0%}"
+        )
+
+    def render_task(self, task: TaskModel, dates: DateRenderer | None = None) -> MessageFactory:
+        """Render the full description of a task snapshot"""
         msg = MessageFactory()
         if task.is_deleted:
             msg += f"[{task.name}] 已被删除"
         else:
             msg += f"[{task.name}] "
-            msg += (await self.describe_due_time(task_id)) + "，"
-            msg += (await self.describe_remind(task_id)) + "，"
-            msg += (await self.describe_recurrence(task_id)) + "，"
-            msg += (await self.describe_assignee(task_id))
+            msg += self.describe_due_time(task, dates) + "，"
+            msg += self.describe_remind(task) + "，"
+            msg += self.describe_recurrence(task) + "，"
+            msg += self.describe_assignee(task)
 
         return msg
 
+    def render_task_list(self, tasks: Iterable[TaskModel], header: str) -> MessageFactory:
+        """Render task snapshots as a numbered list in one pass"""
+        msg = MessageFactory(header)
+        dates = date_renderer()
+        for i, task in enumerate(tasks, 1):
+            msg += [f"\n{i}. "] + self.render_task(task, dates)
+        return msg
+
+    async def describe_task(
+            self,
+            task_id: uuid.UUID
+    ):
+        logger.debug(f"Generating description of task: {task_id}")
+        return self.render_task(await self.get_task_snapshot(task_id, include_deleted=True))
+
     # Task Normal behaviour related
     # include: 
     # - finish (change due time and current assignee, and reschedule remind job)
@@ -443,6 +1125,7 @@ class TaskService(Service):
 
     async def finish_task(self, task_id: uuid.UUID):
         """Mark a task as finished and reschedule if it has recurring intervals."""
+        self.invalidate_lookup(task_id)
         task = await self.__get_task(task_id)
         try:
             assignment = (
@@ -460,22 +1143,25 @@ class TaskService(Service):
         else:
             assignee_id = assignment.assignee_id
 
+        finish_time = datetime.now()
         new_record = RecordModel(
             task_id=task_id,
             assignee_id=assignee_id,
             due_time=task.due_time,
-            finish_time=datetime.now()
+            finish_time=finish_time,
+            delay_seconds=(finish_time - task.due_time).total_seconds()
         )
 
         self.session.add(new_record)
+        task.ignored_reminders = 0
+        if assignee_id is not None:
+            await self.roll_up_delay(task, assignee_id, finish_time, new_record.delay_seconds)
 
         match task.recur_type:
             case RecurType.Never:
-                await self.remove_reminder(task_id)
-                task.due_time = None
-                await self.delete_task(task)
+                await self.delete_task(task_id)
             case RecurType.OnFinish:
-                task.due_time = datetime.now() + task.recur_interval
+                task.due_time = finish_time + task.recur_interval
                 await self.refresh_reminder(task_id)
                 if assignee_id is not None:
                     await self.shift_current_assignee_order(task_id, 1)
@@ -485,8 +1171,6 @@ class TaskService(Service):
                 if assignee_id is not None:
                     await self.shift_current_assignee_order(task_id, 1)
 
-        await self.session.commit()
-        await self.session.refresh(task)
         logger.debug(
             f"Finished task {task.id}, next due: {task.due_time}, next assignee: {task.current_assignment_order}")
 
@@ -494,59 +1178,316 @@ class TaskService(Service):
         """Mark a task as finished and reschedule if it has recurring intervals."""
         task = await self.__get_task(task_id)
 
-        if len(await self.get_assignee_user_ids(task_id)) <= 1:
+        assignee_count = await self.count_assignees(task_id)
+        if assignee_count <= 1:
             logger.warning(f"Task {task_id} with one or none assignee cannot be skipped")
             return
 
-        await self.shift_current_assignee_order(task_id, offset)
-
-        await self.session.commit()
-        await self.session.refresh(task)
+        await self.shift_current_assignee_order(task_id, offset, assignee_count)
+        # the next assignee was not reminded yet
+        task.ignored_reminders = 0
         logger.debug(
             f"Skipped task {task.id}, next due: {task.due_time}, next assignee: {task.current_assignment_order}")
 
-    async def purge_wild_jobs(self) -> int:
-        # obtain all job id from job store
-        apscheduler_job_ids = [job.id for job in scheduler.get_jobs()]
-        count = 0
+    @staticmethod
+    async def reconcile_reminders(jobstore: "ReminderJobStore") -> tuple[int, int, int]:
+        """Make the apscheduler job store match the undeleted tasks: remove orphan jobs, recreate missing and stale ones.
+
+        The job rows are written in bulk, in one job store transaction. Returns the number of removed, created and replaced jobs."""
+        started = time.perf_counter()
+        # Job states are unpickled off the event loop, only from the plugin's own job store
+        jobs = {
+            job.id: job
+            for job in await asyncio.to_thread(scheduler.get_jobs, 'nonebot-plugin-yareminder-jobstore')
+        }
+
+        async with TaskService(get_session()) as task_service:
+            tasks = (
+                await task_service.session.execute(
+                    select(
+                        TaskModel.id, TaskModel.name, TaskModel.apscheduler_job_id,
+                        TaskModel.due_time, TaskModel.remind_offset, TaskModel.remind_interval
+                    )
+                    .where(TaskModel.is_deleted == False, TaskModel.due_time.is_not(None))
+                )
+            ).all()
+
+            orphan_job_ids = jobs.keys() - {task.apscheduler_job_id for task in tasks}
+            new_job_ids, reminders, replaced = [], [], 0
+            for task_id, name, job_id, due_time, remind_offset, remind_interval in tasks:
+                start = due_time + remind_offset
+                if job_id is None:
+                    job_id = uuid.uuid4().hex
+                    new_job_ids.append({"id": task_id, "apscheduler_job_id": job_id})
+                elif job_id in jobs:
+                    if is_reminder_job_current(jobs[job_id], task_id, start, remind_interval):
+                        continue
+                    replaced += 1
+                reminders.append((job_id, task_id, name, start, remind_interval))
+            if new_job_ids:
+                await task_service.session.execute(update(TaskModel), new_job_ids)
+
+        now = datetime.now(scheduler.timezone)
+        await asyncio.to_thread(
+            jobstore.replace_jobs, orphan_job_ids, [create_reminder_job(*reminder, now) for reminder in reminders]
+        )
+        # Written past the scheduler, which looks for the next due job once woken up
+        if scheduler.state == STATE_RUNNING:
+            scheduler.wakeup()
+        counts = len(orphan_job_ids), len(reminders) - replaced, replaced
+        logger.info(
+            f"Reconciled {len(jobs)} reminder jobs with {len(tasks)} tasks in {time.perf_counter() - started:.2f}s: "
+            f"removed {counts[0]}, created {counts[1]}, replaced {counts[2]}"
+        )
+        return counts
+
+
+send_dispatcher = SendDispatcher(
+    concurrency=plugin_config.yareminder_send_concurrency,
+    platform_rate=plugin_config.yareminder_platform_rate,
+    platform_burst=plugin_config.yareminder_platform_burst,
+    target_rate=plugin_config.yareminder_target_rate,
+    target_burst=plugin_config.yareminder_target_burst
+)
+reminder_coalescer = ReminderCoalescer(TaskService.send_coalesced_reminders, plugin_config.yareminder_coalesce_window)
+
+
+class MaintenanceService(Service):
+    async def archive_records(self, cutoff: datetime, limit: int) -> int:
+        """Fold at most `limit` records finished before the cutoff into summaries and delete them"""
+        records = (
+            await self.session.execute(
+                select(
+                    RecordModel.id, RecordModel.task_id, RecordModel.assignee_id,
+                    RecordModel.finish_time, RecordModel.delay_seconds
+                )
+                .where(RecordModel.finish_time < cutoff)
+                .order_by(RecordModel.finish_time)
+                .limit(limit)
+            )
+        ).all()
+        if not records:
+            return 0
+
+        aggregates: dict[tuple, list] = {}
+        for _, task_id, assignee_id, finish_time, delay in records:
+            # Unassigned records never show up in delay stats, so they are dropped without a summary
+            if assignee_id is None or delay is None:
+                continue
+            fold_delay(aggregates, (task_id, assignee_id, finish_time.strftime("%Y-%m")), delay, delay, 1,
+                       1 if delay <= 0 else 0)
+
+        existing = {
+            (summary.task_id, summary.assignee_id, summary.month): summary
+            for summary in (
+                await self.session.execute(
+                    select(RecordSummaryModel)
+                    .where(
+                        RecordSummaryModel.task_id.in_({key[0] for key in aggregates}),
+                        RecordSummaryModel.month.in_({key[2] for key in aggregates})
+                    )
+                )
+            ).scalars()
+        }
+        for (task_id, assignee_id, month), (delay_sum, delay_max, count, on_time_count) in aggregates.items():
+            summary = existing.get((task_id, assignee_id, month))
+            if summary is None:
+                self.session.add(RecordSummaryModel(
+                    task_id=task_id, assignee_id=assignee_id, month=month,
+                    delay_sum=delay_sum, delay_max=delay_max, count=count, on_time_count=on_time_count
+                ))
+            else:
+                summary.delay_sum += delay_sum
+                summary.delay_max = max(summary.delay_max, delay_max)
+                summary.count += count
+                summary.on_time_count += on_time_count
+
+        await self.session.execute(delete(RecordModel).where(RecordModel.id.in_([record.id for record in records])))
+        return len(records)
+
+    @staticmethod
+    async def prune_records(retention: timedelta, batch_size: int) -> int:
+        """Archive records older than the retention period in bounded transactions, returns the record count"""
+        cutoff = datetime.now() - retention
+        started = time.perf_counter()
+        total = 0
+        while True:
+            async with MaintenanceService(get_session()) as maintenance_service:
+                count = await maintenance_service.archive_records(cutoff, batch_size)
+            total += count
+            if count < batch_size:
+                break
+            # Let pending reminders and commands run between batches
+            await asyncio.sleep(0)
+        logger.info(
+            f"Archived {total} records finished before {cutoff} in {time.perf_counter() - started:.2f}s"
+        )
+        return total
 
-        controlled_job_ids = (
+    async def vacuum_tasks(self, cutoff: datetime, limit: int) -> Counter:
+        """Hard delete at most `limit` tasks soft deleted before the cutoff, with every row referencing them"""
+        task_ids = (
             await self.session.execute(
-                select(TaskModel.apscheduler_job_id)
-                .where(TaskModel.is_deleted == False)
+                select(TaskModel.id)
+                .where(TaskModel.is_deleted == True, TaskModel.deleted_at < cutoff)
+                .limit(limit)
             )
         ).scalars().all()
+        reclaimed = Counter()
+        if not task_ids:
+            return reclaimed
+
+        await self.fold_vacuumed_history(task_ids)
+        # Children first, monthly rollups are per chat and keep counting the vacuumed tasks
+        for model, task_id_column in (
+                (RecordModel, RecordModel.task_id),
+                (RecordSummaryModel, RecordSummaryModel.task_id),
+                (DelayRollupModel, DelayRollupModel.task_id),
+                (AssignmentModel, AssignmentModel.task_id),
+                (TaskModel, TaskModel.id),
+        ):
+            result = await self.session.execute(delete(model).where(task_id_column.in_(task_ids)))
+            reclaimed[model.__tablename__] += result.rowcount
+        return reclaimed
+
+    async def fold_vacuumed_history(self, task_ids: Sequence[uuid.UUID]):
+        """Fold the records and summaries of tasks about to be vacuumed into per chat summaries,
+        which `rebuild_delay_rollups` reads back into the monthly rollups"""
+        aggregates: dict[tuple, list] = {}
+        records = await self.session.execute(
+            select(TaskModel.target_id, RecordModel.assignee_id, RecordModel.finish_time, RecordModel.delay_seconds)
+            .join(TaskModel, TaskModel.id == RecordModel.task_id)
+            .where(RecordModel.task_id.in_(task_ids), RecordModel.assignee_id.is_not(None))
+        )
+        for target_id, assignee_id, finish_time, delay in records:
+            if delay is None:
+                continue
+            fold_delay(aggregates, (target_id, assignee_id, finish_time.strftime("%Y-%m")), delay, delay, 1,
+                       1 if delay <= 0 else 0)
+        summaries = await self.session.execute(
+            select(
+                TaskModel.target_id, RecordSummaryModel.assignee_id, RecordSummaryModel.month,
+                RecordSummaryModel.delay_sum, RecordSummaryModel.delay_max, RecordSummaryModel.count,
+                RecordSummaryModel.on_time_count
+            )
+            .join(TaskModel, TaskModel.id == RecordSummaryModel.task_id)
+            .where(RecordSummaryModel.task_id.in_(task_ids))
+        )
+        for target_id, assignee_id, month, *aggregate in summaries:
+            fold_delay(aggregates, (target_id, assignee_id, month), *aggregate)
+        if not aggregates:
+            return
 
-        for job_id in apscheduler_job_ids:
-            if job_id not in controlled_job_ids:
-                scheduler.remove_job(job_id)
-                count += 1
+        existing = {
+            (summary.target_id, summary.assignee_id, summary.month): summary
+            for summary in (
+                await self.session.execute(
+                    select(VacuumedRecordSummaryModel)
+                    .where(
+                        VacuumedRecordSummaryModel.target_id.in_({key[0] for key in aggregates}),
+                        VacuumedRecordSummaryModel.month.in_({key[2] for key in aggregates})
+                    )
+                )
+            ).scalars()
+        }
+        for (target_id, assignee_id, month), (delay_sum, delay_max, count, on_time_count) in aggregates.items():
+            summary = existing.get((target_id, assignee_id, month))
+            if summary is None:
+                self.session.add(VacuumedRecordSummaryModel(
+                    target_id=target_id, assignee_id=assignee_id, month=month,
+                    delay_sum=delay_sum, delay_max=delay_max, count=count, on_time_count=on_time_count
+                ))
+            else:
+                summary.delay_sum += delay_sum
+                summary.delay_max = max(summary.delay_max, delay_max)
+                summary.count += count
+                summary.on_time_count += on_time_count
 
-        return count
+    @staticmethod
+    async def vacuum_deleted_tasks(grace: timedelta, batch_size: int) -> Counter:
+        """Hard delete tasks soft deleted before the grace period in bounded transactions, returns rows per table"""
+        cutoff = datetime.now() - grace
+        started = time.perf_counter()
+        reclaimed = Counter()
+        while True:
+            async with MaintenanceService(get_session()) as maintenance_service:
+                batch = await maintenance_service.vacuum_tasks(cutoff, batch_size)
+            reclaimed += batch
+            if batch[TaskModel.__tablename__] < batch_size:
+                break
+            await asyncio.sleep(0)
+        logger.info(
+            f"Vacuumed tasks deleted before {cutoff} in {time.perf_counter() - started:.2f}s, "
+            f"reclaimed {sum(reclaimed.values())} rows: {dict(reclaimed)}"
+        )
+        return reclaimed
+
+    @staticmethod
+    async def run_maintenance():
+        """Run the configured maintenance jobs"""
+        if plugin_config.yareminder_record_retention_days is not None:
+            await MaintenanceService.prune_records(
+                timedelta(days=plugin_config.yareminder_record_retention_days),
+                plugin_config.yareminder_maintenance_batch_size
+            )
+        if plugin_config.yareminder_deleted_task_grace_days is not None:
+            await MaintenanceService.vacuum_deleted_tasks(
+                timedelta(days=plugin_config.yareminder_deleted_task_grace_days),
+                plugin_config.yareminder_maintenance_batch_size
+            )
 
 
 class AssigneeService(Service):
-    async def add_assignee(self, user_id: str):
-        """Add an assignee"""
-        logger.debug(f"Adding assignee {user_id}")
-        new_assignee = AssigneeModel(user_id=user_id)
-        self.session.add(new_assignee)
+    async def add_assignees(self, user_ids: Sequence[str]) -> list[uuid.UUID]:
+        """Resolve or create the assignees of user ids with one INSERT and one SELECT, ids are in input order"""
+        unique_user_ids = list(dict.fromkeys(user_ids))
+        if not unique_user_ids:
+            return []
+        logger.debug(f"Adding assignees {unique_user_ids}")
 
-        try:
-            await self.session.commit()
-        except IntegrityError as e:
-            logger.debug(f"Duplication detected: {e}, try locating existing assignee id")
-            await self.session.rollback()
+        dialect = self.session.get_bind(AssigneeModel).dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            # Dialect modules are imported here, only the one of the engine in use is ever loaded
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            statement = insert(AssigneeModel).on_conflict_do_nothing(index_elements=[AssigneeModel.user_id])
+            new_user_ids = unique_user_ids
+        elif dialect in ("mysql", "mariadb"):
+            statement = sa_insert(AssigneeModel).prefix_with("IGNORE")
+            new_user_ids = unique_user_ids
+        else:
+            # No portable upsert, only insert the missing ones
+            statement = sa_insert(AssigneeModel)
+            existing = set(
+                (
+                    await self.session.execute(
+                        select(AssigneeModel.user_id).where(AssigneeModel.user_id.in_(unique_user_ids))
+                    )
+                ).scalars()
+            )
+            new_user_ids = [user_id for user_id in unique_user_ids if user_id not in existing]
 
-            return (
-                await self.session.execute(
-                    select(AssigneeModel.id)
-                    .where(AssigneeModel.user_id == user_id)
-                )
-            ).scalar_one()
+        if new_user_ids:
+            # ids are generated here, column defaults do not apply to multi row core inserts
+            await self.session.execute(
+                statement, [{"id": str(uuid.uuid4()), "user_id": user_id} for user_id in new_user_ids]
+            )
 
-        await self.session.refresh(new_assignee)
-        return new_assignee.id
+        rows = (
+            await self.session.execute(
+                select(AssigneeModel.user_id, AssigneeModel.id).where(AssigneeModel.user_id.in_(unique_user_ids))
+            )
+        ).all()
+        assignee_ids = {user_id: assignee_id for user_id, assignee_id in rows}
+        # The chats of new assignees are recorded again from their next message on
+        self.after_commit(reachability_seen.clear)
+        return [assignee_ids[user_id] for user_id in user_ids]
+
+    async def add_assignee(self, user_id: str):
+        """Add an assignee"""
+        return (await self.add_assignees([user_id]))[0]
 
 
 async def get_task_service() -> AsyncGenerator[TaskService, None]:
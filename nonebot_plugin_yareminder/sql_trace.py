@@ -0,0 +1,110 @@
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from nonebot import logger
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import plugin_config
+
+
+class CommandTrace:
+    """SQL statements issued while handling one rmd command, and the time spent in them"""
+    __slots__ = ("command", "started", "statements", "db_time")
+
+    def __init__(self, command: str):
+        self.command = command
+        self.started = time.perf_counter()
+        self.statements: list[tuple[str, str]] = []
+        self.db_time = 0.0
+
+
+current_trace: ContextVar[CommandTrace | None] = ContextVar("yareminder_current_trace", default=None)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    trace = current_trace.get()
+    if trace is not None:
+        trace.statements.append((statement, "executemany" if executemany else repr(parameters)))
+        conn.info.setdefault("yareminder_started", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    trace = current_trace.get()
+    if trace is not None and conn.info.get("yareminder_started"):
+        trace.db_time += time.perf_counter() - conn.info["yareminder_started"].pop()
+
+
+def shorten(statement: str, limit: int = 120) -> str:
+    statement = re.sub(r"\s+", " ", statement).strip()
+    return statement if len(statement) <= limit else statement[:limit - 3] + "..."
+
+
+class SQLTracer:
+    """Group the SQL statements of each rmd command; with `log`, log them, flagging repeated ones and exceeded
+    per-command budgets"""
+
+    def __init__(self, budgets: dict[str, int], log: bool = True):
+        self.budgets = budgets
+        self.log = log
+
+    @staticmethod
+    def install():
+        """Attribute the statements of every engine to the traced command of the current context, once per process"""
+        if not event.contains(Engine, "before_cursor_execute", before_cursor_execute):
+            event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", after_cursor_execute)
+
+    def begin(self, command: str) -> CommandTrace:
+        """Start collecting the statements of a command in the current context"""
+        trace = CommandTrace(command)
+        current_trace.set(trace)
+        return trace
+
+    def exceeds_budget(self, trace: CommandTrace) -> bool:
+        budget = self.budgets.get(trace.command)
+        return budget is not None and len(trace.statements) > budget
+
+    def end(self, trace: CommandTrace | None):
+        """Stop collecting, and log the compact trace of the command"""
+        if trace is None:
+            return
+        current_trace.set(None)
+        if self.log:
+            self.log_trace(trace)
+
+    def log_trace(self, trace: CommandTrace):
+        count = len(trace.statements)
+        budget = self.budgets.get(trace.command)
+        exceeded = self.exceeds_budget(trace)
+        lines = [
+            f"SQL trace of rmd {trace.command}: {count} statements in "
+            f"{(time.perf_counter() - trace.started) * 1000:.1f}ms"
+            + (f", budget {budget}{' EXCEEDED' if exceeded else ''}" if budget is not None else "")
+        ]
+        repeated = Counter(trace.statements)
+        for statement, times in Counter(statement for statement, _ in trace.statements).items():
+            lines.append(f"  {times}x {shorten(statement)}")
+        for (statement, parameters), times in repeated.items():
+            if times > 1:
+                lines.append(f"  REPEATED {times}x with {shorten(parameters, 60)}: {shorten(statement, 80)}")
+        (logger.warning if exceeded or len(repeated) < count else logger.info)("\n".join(lines))
+
+    @contextmanager
+    def trace(self, command: str):
+        """Trace the statements of a block as a command, e.g. to enforce budgets from a test harness"""
+        trace = self.begin(command)
+        try:
+            yield trace
+        finally:
+            self.end(trace)
+
+
+# Also the statement counter of the command metrics, which log nothing
+sql_tracer: SQLTracer | None = None
+if plugin_config.yareminder_sql_trace or plugin_config.yareminder_metrics_exporter is not None:
+    sql_tracer = SQLTracer(plugin_config.yareminder_sql_budgets, log=plugin_config.yareminder_sql_trace)
+    sql_tracer.install()
@@ -0,0 +1,73 @@
+from functools import lru_cache
+from string import Formatter
+
+from nonebot import require
+
+require("nonebot_plugin_saa")
+from nonebot_plugin_saa import MessageFactory, MessageSegmentFactory, Text
+
+# placeholder: description shown to users
+PLACEHOLDERS = {
+    "name": "任务名",
+    "due": "截止时间描述，如“在明天08:00前完成”",
+    "assignee": "当前指派人（At 后接一个空格），无指派时为空",
+    "overdue": "已超时时长，如“2小时30分”，未超时时为空",
+    "position": "当前指派人在轮换中的位置，如“2/3”，无指派时为空",
+}
+# The text of reminders before templates existed, for tasks before and after their due time
+DEFAULT_REMINDER_TEMPLATE = "{assignee}请记得{due}{name}"
+DEFAULT_OVERDUE_TEMPLATE = "{assignee}{name}应{due}哦"
+
+
+class TemplateError(ValueError):
+    """A template that cannot be compiled, e.g. with an unknown placeholder"""
+
+
+class CompiledTemplate:
+    """A message template parsed once into literal text and placeholder names"""
+    __slots__ = ("source", "parts", "fields")
+
+    def __init__(self, source: str):
+        if not source.strip():
+            raise TemplateError("模板不能为空")
+        try:
+            parsed = list(Formatter().parse(source))
+        except ValueError as e:
+            raise TemplateError(f"模板格式错误：{e}") from None
+
+        parts: list[tuple[str, bool]] = []
+        for literal, field, format_spec, conversion in parsed:
+            if literal:
+                parts.append((literal, False))
+            if field is None:
+                continue
+            if field not in PLACEHOLDERS:
+                raise TemplateError(f"未知的占位符 {{{field}}}，可用：{'、'.join(f'{{{p}}}' for p in PLACEHOLDERS)}")
+            if format_spec or conversion:
+                raise TemplateError(f"占位符 {{{field}}} 不支持格式说明")
+            parts.append((field, True))
+        self.source = source
+        self.parts = tuple(parts)
+        # Placeholders whose values the caller needs to compute
+        self.fields = frozenset(value for value, is_field in parts if is_field)
+
+    def render(self, values: dict[str, str | list[MessageSegmentFactory]]) -> MessageFactory:
+        """Render with a value for every placeholder in `fields`, a list value is spliced in as segments"""
+        segments = []
+        for value, is_field in self.parts:
+            if not is_field:
+                segments.append(Text(value))
+                continue
+            value = values[value]
+            if isinstance(value, str):
+                if value:
+                    segments.append(Text(value))
+            else:
+                segments += value
+        return MessageFactory(segments)
+
+
+@lru_cache(maxsize=256)
+def compile_template(source: str) -> CompiledTemplate:
+    """Compile a template, cached by its text, so an edited template is a new entry and never stale"""
+    return CompiledTemplate(source)
@@ -0,0 +1,215 @@
+import re
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import NamedTuple
+
+
+class TimeParseError(ValueError):
+    """The argument is not a time expression this plugin understands"""
+
+
+CN_DIGITS = {"零": 0, "〇": 0, "一": 1, "二": 2, "两": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9}
+WEEKDAYS = {"一": 0, "二": 1, "三": 2, "四": 3, "五": 4, "六": 5, "日": 6, "天": 6, "七": 6}
+RELATIVE_DAYS = {"今天": 0, "明天": 1, "后天": 2, "大后天": 3}
+# Periods of the day that move a 12-hour clock hour into the afternoon
+PM_PERIODS = {"下午", "傍晚", "晚上"}
+
+NUMBER = r"\d+|[零〇一二两三四五六七八九十]+"
+
+DURATION_UNITS = {
+    "w": timedelta(weeks=1), "周": timedelta(weeks=1), "星期": timedelta(weeks=1), "礼拜": timedelta(weeks=1),
+    "d": timedelta(days=1), "天": timedelta(days=1), "日": timedelta(days=1),
+    "h": timedelta(hours=1), "小时": timedelta(hours=1), "钟头": timedelta(hours=1),
+    "m": timedelta(minutes=1), "分钟": timedelta(minutes=1), "分": timedelta(minutes=1),
+    "s": timedelta(seconds=1), "秒钟": timedelta(seconds=1), "秒": timedelta(seconds=1),
+}
+UNIT = r"星期|礼拜|小时|钟头|分钟|秒钟|[周天日分秒wdhms]"
+# 3d5h19m1s, the compact form in the usage of every command
+COMPACT_DURATION_PATTERN = re.compile(r"(?P<sign>-)?(?:(?P<d>\d+)d)?(?:(?P<h>\d+)h)?(?:(?P<m>\d+)m)?(?:(?P<s>\d+)s)?", re.I)
+# 3天, 半小时, 一个半小时, 1天半; a 半 after the unit is not the 半 of a following 半小时
+DURATION_PART = (
+    rf"(?:(?P<number>{NUMBER})个?(?P<number_half>半)?|(?P<half>半))?个?(?P<unit>{UNIT})(?P<unit_half>半(?!个?(?:{UNIT})))?"
+)
+DURATION_PART_PATTERN = re.compile(DURATION_PART, re.I)
+# The same part repeated, without its named groups
+DURATION_PARTS = re.sub(r"\(\?P<\w+>", "(?:", DURATION_PART)
+DURATION_PATTERN = re.compile(rf"(?P<sign>-|\+|提前|延后)?每?(?P<parts>(?:{DURATION_PARTS})+)", re.I)
+DATETIME_PATTERN = re.compile(
+    r"(?:(?P<relative_day>今天|明天|后天|大后天)"
+    r"|(?P<week>本|这|上|下+)?(?:周|星期|礼拜)(?P<weekday>[一二三四五六日天七1-7])"
+    r"|(?:(?P<year>\d{4})年)?(?P<month>\d{1,2})月(?P<day>\d{1,2})[日号])?"
+    r"(?P<period>凌晨|早上|早晨|上午|中午|下午|傍晚|晚上)?"
+    rf"(?:(?P<hour>{NUMBER})(?:点|时|:|：)(?:(?P<minute>{NUMBER})分?|(?P<half>半))?)?"
+)
+
+
+def parse_number(s: str) -> int:
+    """Parse arabic digits or a Chinese numeral below one hundred"""
+    if s.isdigit():
+        return int(s)
+    try:
+        if "十" in s:
+            tens, _, ones = s.partition("十")
+            return (CN_DIGITS[tens] if tens else 1) * 10 + (CN_DIGITS[ones] if ones else 0)
+        return CN_DIGITS[s]
+    except KeyError:
+        raise TimeParseError(f"Unknown number {s}") from None
+
+
+@lru_cache(maxsize=256)
+def parse_timedelta(s: str) -> timedelta:
+    """Parse a duration, either compact (3d5h19m1s, -5h30m) or Chinese (3天, 2小时30分, 一个半小时, 每2周, 提前1天).
+
+    A leading - or 提前 makes the whole duration negative, an empty one is zero.
+    """
+    s = s.strip()
+    if not s:
+        return timedelta()
+    match = COMPACT_DURATION_PATTERN.fullmatch(s)
+    if match and any(match.group(unit) for unit in "dhms"):
+        delta = timedelta(**{
+            unit: int(match.group(key)) for unit, key in (("days", "d"), ("hours", "h"), ("minutes", "m"), ("seconds", "s"))
+            if match.group(key)
+        })
+        return -delta if match.group("sign") else delta
+
+    match = DURATION_PATTERN.fullmatch(s)
+    if not match:
+        raise TimeParseError(f"Unable to parse duration {s}")
+    delta = timedelta()
+    for part in DURATION_PART_PATTERN.finditer(match.group("parts")):
+        unit = DURATION_UNITS[part.group("unit").lower()]
+        if part.group("half"):
+            delta += unit / 2
+        elif part.group("number"):
+            delta += unit * parse_number(part.group("number"))
+        elif part.group("unit").isascii():
+            raise TimeParseError(f"Missing number before {part.group('unit')} in {s}")
+        else:
+            delta += unit
+        if part.group("number_half") or part.group("unit_half"):
+            delta += unit / 2
+    return -delta if match.group("sign") in ("-", "提前") else delta
+
+
+class DateSpec(NamedTuple):
+    """A parsed due time, resolved against the current time since most expressions are relative"""
+    absolute: datetime | None = None
+    # "3天后"
+    delta: timedelta | None = None
+    # "明天", "大后天"
+    days: int = 0
+    # "周三" is the next Wednesday from today on, "下周三" the Wednesday of next week
+    weekday: int | None = None
+    weeks: int | None = None
+    # "5月1日" is the next May 1st from today on, unless the year is given
+    month_day: tuple[int | None, int, int] | None = None
+    at: time | None = None
+    # "晚上12点" is the midnight at the end of the day
+    past_midnight: bool = False
+
+    def resolve(self, now: datetime) -> datetime:
+        if self.absolute is not None:
+            return self.absolute
+        if self.delta is not None:
+            return (now + self.delta).replace(microsecond=0)
+
+        today = now.date()
+        day = today + timedelta(days=self.days)
+        if self.weekday is not None:
+            if self.weeks is None:
+                day += timedelta(days=(self.weekday - day.weekday()) % 7)
+            else:
+                day += timedelta(days=self.weeks * 7 + self.weekday - day.weekday())
+        elif self.month_day is not None:
+            year, month, month_day = self.month_day
+            day = date(year or today.year, month, month_day)
+            if year is None and day < today:
+                day = day.replace(year=today.year + 1)
+        if self.past_midnight:
+            day += timedelta(days=1)
+        return datetime.combine(day, self.at or time())
+
+
+def to_local_naive(value: datetime) -> datetime:
+    """Due times are stored as naive local times, like datetime.now()"""
+    return value.astimezone().replace(tzinfo=None) if value.tzinfo else value
+
+
+def compile_clock(match: re.Match) -> tuple[time | None, bool]:
+    """The time of day, and whether it is past the midnight ending the day, as in 晚上12点"""
+    if match.group("hour") is None:
+        if match.group("period"):
+            raise TimeParseError(f"Missing hour after {match.group('period')}")
+        return None, False
+    hour = parse_number(match.group("hour"))
+    minute = 30 if match.group("half") else parse_number(match.group("minute")) if match.group("minute") else 0
+    period = match.group("period")
+    past_midnight = hour == 12 and period == "晚上"
+    if hour < 12 and (period in PM_PERIODS or (period == "中午" and hour < 11)):
+        hour += 12
+    elif hour == 12 and period in ("凌晨", "晚上"):
+        hour = 0
+    try:
+        return time(hour, minute), past_midnight
+    except ValueError as e:
+        raise TimeParseError(str(e)) from None
+
+
+@lru_cache(maxsize=256)
+def compile_datetime(s: str) -> DateSpec:
+    """Parse a due time into a DateSpec, cached by the expression, not by its value at a given time"""
+    try:
+        return DateSpec(absolute=to_local_naive(datetime.fromisoformat(s)))
+    except ValueError:
+        pass
+
+    if s.endswith("后"):
+        try:
+            return DateSpec(delta=parse_timedelta(s[:-1]))
+        except TimeParseError:
+            pass
+
+    match = DATETIME_PATTERN.fullmatch(s)
+    if match and any(match.groups()):
+        at, past_midnight = compile_clock(match)
+        if match.group("relative_day"):
+            return DateSpec(days=RELATIVE_DAYS[match.group("relative_day")], at=at, past_midnight=past_midnight)
+        if match.group("weekday"):
+            weekday = match.group("weekday")
+            week = match.group("week")
+            weeks = None if week is None else 0 if week in ("本", "这") else -1 if week == "上" else len(week)
+            return DateSpec(
+                weekday=int(weekday) - 1 if weekday.isdigit() else WEEKDAYS[weekday], weeks=weeks, at=at,
+                past_midnight=past_midnight
+            )
+        if match.group("month"):
+            year, month, day = match.group("year", "month", "day")
+            try:
+                date(int(year or 2000), int(month), int(day))
+            except ValueError as e:
+                raise TimeParseError(str(e)) from None
+            return DateSpec(
+                month_day=(int(year) if year else None, int(month), int(day)), at=at, past_midnight=past_midnight
+            )
+        return DateSpec(at=at, past_midnight=past_midnight)
+
+    # Less common ISO 8601 forms, e.g. week dates
+    import pendulum
+    try:
+        return DateSpec(absolute=to_local_naive(pendulum.parse(s, tz=None)))
+    except ValueError:
+        raise TimeParseError(f"Unable to parse date time {s}") from None
+
+
+def to_datetime(s: str) -> datetime:
+    """Parse an ISO 8601 date time, or a Chinese expression like 明天8点, 下周三下午3点, 5月1日, 3天后.
+
+    Times without a timezone are local, and the result is a naive local datetime.
+    """
+    return compile_datetime(s.strip()).resolve(datetime.now())
+
+
+def to_timedelta(s: str) -> timedelta:
+    # A plain function, Alconna takes the argument type from its annotations
+    return parse_timedelta(s)
@@ -0,0 +1,181 @@
+"""Fixtures running the plugin against an in-memory SQLite database.
+
+nonebot is initialized once per test session, as it is process wide. Every test starts
+from empty tables and empty in-process caches.
+"""
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import nonebot
+import pytest
+from sqlalchemy.pool import StaticPool
+
+
+def pytest_configure(config):
+    data_dir = Path(tempfile.mkdtemp(prefix="yareminder-tests-"))
+    nonebot.init(
+        driver="~none",
+        # One connection shared by every session, an in-memory database lives as long as its connection
+        sqlalchemy_database_url="sqlite+aiosqlite://",
+        sqlalchemy_engine_options={"poolclass": StaticPool},
+        alembic_startup_check=False,
+        localstore_data_dir=str(data_dir / "data"),
+        localstore_cache_dir=str(data_dir / "cache"),
+        localstore_config_dir=str(data_dir / "config"),
+        command_start=["/"],
+        log_level="WARNING",
+    )
+    nonebot.load_plugin("nonebot_plugin_yareminder")
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+async def database():
+    """Create the schema from the models, equivalent to the migrations at head"""
+    from nonebot_plugin_orm import Model, get_session
+
+    async with get_session() as session:
+        connection = await session.connection()
+        await connection.run_sync(Model.metadata.create_all)
+        await session.commit()
+
+
+@pytest.fixture
+async def clean_database(database):
+    """Empty tables and caches before the test"""
+    from nonebot_plugin_orm import Model, get_session
+    from nonebot_plugin_yareminder import service
+
+    async with get_session() as session:
+        for table in reversed(Model.metadata.sorted_tables):
+            if table.name.startswith("nonebot_plugin_yareminder_"):
+                await session.execute(table.delete())
+        await session.commit()
+    service.target_id_cache.clear()
+    service.task_lookup_cache.clear()
+    service.reachability_seen.clear()
+
+
+@pytest.fixture
+def group():
+    from nonebot_plugin_saa import TargetQQGroup
+
+    return TargetQQGroup(group_id=1)
+
+
+@pytest.fixture
+def make_task(clean_database, group):
+    """Create a task in `group` (unless another target is given) with the assignees in order"""
+    from nonebot_plugin_orm import get_session
+    from nonebot_plugin_yareminder.service import TaskService, AssigneeService
+    from nonebot_plugin_yareminder.utils import RecurType
+
+    async def make_task(name: str, assignees=(), target=None, due_time: datetime | None = None):
+        session = get_session()
+        async with TaskService(session) as task_service, AssigneeService(session) as assignee_service:
+            task_id = await task_service.create_task(
+                name, due_time or datetime.now() + timedelta(days=1), timedelta(hours=-1), timedelta(hours=1),
+                timedelta(days=1), RecurType.Regular, target or group
+            )
+            if assignees:
+                await task_service.create_assignments(task_id, await assignee_service.add_assignees(assignees))
+        return task_id
+
+    return make_task
+
+
+async def add_flow(task_service, assignee_service, target, task_name):
+    from nonebot_plugin_yareminder.utils import RecurType
+
+    task_id = await task_service.create_task(
+        task_name + "2", datetime.now() + timedelta(days=1), timedelta(hours=-1), timedelta(hours=1),
+        timedelta(days=1), RecurType.Regular, target
+    )
+    await task_service.describe_task(task_id)
+    await task_service.commit()
+
+
+async def finish_flow(task_service, assignee_service, target, task_name):
+    task_id = await task_service.find_task_id(task_name, target)
+    await task_service.finish_task(task_id)
+    await task_service.describe_task(task_id)
+    await task_service.commit()
+
+
+async def skip_flow(task_service, assignee_service, target, task_name):
+    task_id = await task_service.find_task_id(task_name, target)
+    await task_service.skip_task(task_id, 1)
+    await task_service.describe_task(task_id)
+    await task_service.commit()
+
+
+async def due_flow(task_service, assignee_service, target, task_name):
+    task_id = await task_service.find_task_id(task_name, target)
+    await task_service.set_task(task_id, due_time=datetime.now() + timedelta(days=2))
+    task_service.describe_due_time(await task_service.get_task_snapshot(task_id))
+    await task_service.commit()
+
+
+async def remind_flow(task_service, assignee_service, target, task_name):
+    task_id = await task_service.find_task_id(task_name, target)
+    await task_service.set_task(task_id, remind_offset=timedelta(hours=-2), remind_interval=timedelta(minutes=30))
+    task_service.describe_remind(await task_service.get_task_snapshot(task_id))
+    await task_service.commit()
+
+
+async def recur_flow(task_service, assignee_service, target, task_name):
+    task_id = await task_service.find_task_id(task_name, target)
+    await task_service.set_task(task_id, recur_interval=timedelta(days=2))
+    task_service.describe_recurrence(await task_service.get_task_snapshot(task_id))
+    await task_service.commit()
+
+
+async def assign_flow(task_service, assignee_service, target, task_name):
+    task_id = await task_service.find_task_id(task_name, target)
+    await task_service.create_assignments(task_id, await assignee_service.add_assignees(["u8", "u9"]))
+    task_service.describe_assignee(await task_service.get_task_snapshot(task_id))
+    await task_service.commit()
+
+
+async def ls_flow(task_service, assignee_service, target, task_name):
+    task_service.render_task_list(await task_service.list_tasks(scope=target), "")
+
+
+async def stat_flow(task_service, assignee_service, target, task_name):
+    task_id = await task_service.find_task_id(task_name, target)
+    for stat in await task_service.stat_delays(task_id=task_id, scope=target):
+        task_service.describe_delay_stat(stat)
+
+
+# The service calls of the rmd subcommand handlers in command.py, given a task name, without the replies
+COMMAND_FLOWS = {
+    "add": add_flow,
+    "finish": finish_flow,
+    "skip": skip_flow,
+    "due": due_flow,
+    "remind": remind_flow,
+    "recur": recur_flow,
+    "assign": assign_flow,
+    "ls": ls_flow,
+    "stat": stat_flow,
+}
+
+
+@pytest.fixture
+def run_command(group):
+    """Run the service calls of a rmd subcommand on a task in `group`, with the services on one session
+    as the handler dependencies provide them. `on_close` is passed to both services."""
+    from nonebot_plugin_orm import get_session
+    from nonebot_plugin_yareminder.service import TaskService, AssigneeService
+
+    async def run_command(command: str, task_name: str, on_close=None):
+        session = get_session()
+        async with TaskService(session, on_close) as task_service, AssigneeService(session, on_close) as assignee_service:
+            await COMMAND_FLOWS[command](task_service, assignee_service, group, task_name)
+
+    return run_command
@@ -0,0 +1,61 @@
+from datetime import timedelta
+
+import pytest
+from nonebot_plugin_orm import get_session
+from sqlalchemy import func, select
+
+from nonebot_plugin_yareminder.models import RecordModel, RecordSummaryModel
+from nonebot_plugin_yareminder.service import TaskService, MaintenanceService
+
+pytestmark = pytest.mark.anyio
+
+# Archives every record finished so far
+EVERYTHING = timedelta(seconds=-1)
+
+
+async def count(model) -> int:
+    async with get_session() as session:
+        return await session.scalar(select(func.count()).select_from(model))
+
+
+async def stats(**filters):
+    async with TaskService(get_session()) as task_service:
+        return sorted(stat[1:] for stat in await task_service.stat_delays(**filters))
+
+
+async def test_archived_records_are_folded_into_monthly_summaries(make_task, group):
+    wash = await make_task("wash", ["u1", "u2"])
+    async with TaskService(get_session()) as task_service:
+        for _ in range(3):
+            await task_service.finish_task(wash)
+    before = await stats(task_id=wash), await stats(scope=group)
+
+    # three records in batches of two
+    assert await MaintenanceService.prune_records(EVERYTHING, 2) == 3
+    assert await count(RecordModel) == 0
+    async with get_session() as session:
+        summaries = (await session.execute(select(RecordSummaryModel))).scalars().all()
+    assert sorted(summary.count for summary in summaries) == [1, 2]
+    assert all(summary.task_id == wash and summary.on_time_count == summary.count for summary in summaries)
+
+    assert (await stats(task_id=wash), await stats(scope=group)) == before
+    async with TaskService(get_session()) as task_service:
+        await task_service.rebuild_delay_rollups(group)
+    assert (await stats(task_id=wash), await stats(scope=group)) == before
+
+
+async def test_records_within_the_retention_are_kept(make_task):
+    wash = await make_task("wash", ["u1"])
+    async with TaskService(get_session()) as task_service:
+        await task_service.finish_task(wash)
+    assert await MaintenanceService.prune_records(timedelta(days=1), 100) == 0
+    assert await count(RecordModel) == 1 and await count(RecordSummaryModel) == 0
+
+
+async def test_unassigned_records_are_dropped_without_a_summary(make_task):
+    cook = await make_task("cook")
+    async with TaskService(get_session()) as task_service:
+        await task_service.finish_task(cook)
+    assert await count(RecordModel) == 1
+    assert await MaintenanceService.prune_records(EVERYTHING, 100) == 1
+    assert await count(RecordModel) == 0 and await count(RecordSummaryModel) == 0
@@ -0,0 +1,16 @@
+import pytest
+from nonebot_plugin_orm import get_session
+
+from nonebot_plugin_yareminder.service import AssigneeService
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_add_assignees_returns_one_id_per_mention_in_order(clean_database):
+    async with AssigneeService(get_session()) as assignee_service:
+        u1, u2, u1_again = await assignee_service.add_assignees(["u1", "u2", "u1"])
+    assert u1 == u1_again and u1 != u2
+
+    async with AssigneeService(get_session()) as assignee_service:
+        assert (await assignee_service.add_assignees(["u3", "u2"]))[1] == u2
+        assert await assignee_service.add_assignees([]) == []
@@ -0,0 +1,78 @@
+import pytest
+from nonebot_plugin_orm import get_session
+from sqlalchemy import select, update
+
+from nonebot_plugin_yareminder.models import AssigneeModel, AssignmentModel, TaskModel
+from nonebot_plugin_yareminder.service import TaskService, AssigneeService
+
+pytestmark = pytest.mark.anyio
+
+USERS = ["u1", "u2", "u3", "u4"]
+
+
+async def rotation(task_id) -> tuple[list[str], str | None]:
+    """The user ids of a task in rotation order, and whose turn it is"""
+    async with TaskService(get_session()) as task_service:
+        rows = (
+            await task_service.session.execute(
+                select(AssignmentModel.order, AssigneeModel.user_id)
+                .join(AssigneeModel, AssigneeModel.id == AssignmentModel.assignee_id)
+                .where(AssignmentModel.task_id == task_id)
+                .order_by(AssignmentModel.order)
+            )
+        ).all()
+        current = (
+            await task_service.session.execute(
+                select(TaskModel.current_assignment_order).where(TaskModel.id == task_id)
+            )
+        ).scalar_one()
+    assert [order for order, _ in rows] == list(range(len(rows))), "orders have gaps"
+    user_ids = [user_id for _, user_id in rows]
+    return user_ids, user_ids[current] if user_ids else None
+
+
+async def task_with_turn(make_task, current_user: str):
+    task_id = await make_task("wash", USERS)
+    async with TaskService(get_session()) as task_service:
+        await task_service.session.execute(
+            update(TaskModel).where(TaskModel.id == task_id).values(current_assignment_order=USERS.index(current_user))
+        )
+    return task_id
+
+
+async def change_assignments(task_id, user_ids, remove: bool):
+    session = get_session()
+    async with TaskService(session) as task_service, AssigneeService(session) as assignee_service:
+        assignee_ids = await assignee_service.add_assignees(user_ids)
+        if remove:
+            await task_service.remove_assignments(task_id, assignee_ids)
+        else:
+            await task_service.create_assignments(task_id, assignee_ids)
+
+
+@pytest.mark.parametrize(("current", "removed", "expected"), [
+    pytest.param("u3", ["u1"], (["u2", "u3", "u4"], "u3"), id="before the turn"),
+    pytest.param("u3", ["u3"], (["u1", "u2", "u4"], "u4"), id="at the turn"),
+    pytest.param("u3", ["u4"], (["u1", "u2", "u3"], "u3"), id="after the turn"),
+    pytest.param("u4", ["u4"], (["u1", "u2", "u3"], "u1"), id="at the last turn"),
+    pytest.param("u3", ["u1", "u3"], (["u2", "u4"], "u4"), id="before and at the turn"),
+    pytest.param("u2", ["u5"], (USERS, "u2"), id="not assigned"),
+    pytest.param("u3", USERS, ([], None), id="everyone"),
+])
+async def test_remove_assignments_keeps_the_turn(make_task, current, removed, expected):
+    task_id = await task_with_turn(make_task, current)
+    await change_assignments(task_id, removed, remove=True)
+    assert await rotation(task_id) == expected
+
+
+async def test_create_assignments_appends_new_assignees_once(make_task):
+    task_id = await task_with_turn(make_task, "u2")
+    await change_assignments(task_id, ["u2", "u5", "u5", "u6"], remove=False)
+    assert await rotation(task_id) == ([*USERS, "u5", "u6"], "u2")
+
+
+async def test_assignees_can_be_added_again_after_removing_everyone(make_task):
+    task_id = await task_with_turn(make_task, "u3")
+    await change_assignments(task_id, USERS, remove=True)
+    await change_assignments(task_id, ["u4", "u1"], remove=False)
+    assert await rotation(task_id) == (["u4", "u1"], "u4")
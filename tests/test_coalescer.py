@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from nonebot_plugin_yareminder.dispatch import ReminderCoalescer
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def flushed():
+    return []
+
+
+@pytest.fixture
+def coalescer(flushed):
+    async def flush(task_ids):
+        flushed.append(task_ids)
+
+    return ReminderCoalescer(flush, 0.05)
+
+
+async def test_reminders_within_the_window_are_flushed_together(coalescer, flushed):
+    coalescer.add("wash")
+    await asyncio.sleep(0.02)
+    coalescer.add("cook")
+    coalescer.add("wash")
+    assert len(coalescer) == 2 and flushed == []
+
+    await asyncio.sleep(0.06)
+    assert flushed == [["wash", "cook"]]
+    assert len(coalescer) == 0
+
+
+async def test_the_window_opens_with_the_first_reminder_after_a_flush(coalescer, flushed):
+    coalescer.add("wash")
+    await asyncio.sleep(0.07)
+    coalescer.add("cook")
+    await asyncio.sleep(0.07)
+    assert flushed == [["wash"], ["cook"]]
+
+
+async def test_flush_sends_pending_reminders_right_away(coalescer, flushed):
+    await coalescer.flush()
+    assert flushed == []
+
+    coalescer.add("wash")
+    await coalescer.flush()
+    assert flushed == [["wash"]]
+    # the window of the flushed reminder is closed
+    await asyncio.sleep(0.07)
+    assert flushed == [["wash"]]
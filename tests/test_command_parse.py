@@ -0,0 +1,22 @@
+import pytest
+from nonebot_plugin_alconna import At
+
+from nonebot_plugin_yareminder.command.alconna import alc
+
+
+@pytest.mark.parametrize(
+    ("message", "task_name", "assignees", "rebuild"),
+    [
+        ("/rmd stat", None, (), False),
+        ("/rmd stat 洗碗", "洗碗", (), False),
+        ("/rmd stat --rebuild", None, (), True),
+        (["/rmd stat ", At("user", "u1")], None, ("u1",), False),
+        (["/rmd stat 洗碗 ", At("user", "u1"), At("user", "u2")], "洗碗", ("u1", "u2"), False),
+    ],
+)
+def test_stat_arguments_are_optional(message, task_name, assignees, rebuild):
+    result = alc.parse(message)
+    assert result.matched, result.error_info
+    assert result["stat.task_name"] == task_name
+    assert tuple(at.target for at in result["stat.assignees"]) == assignees
+    assert bool(result.find("stat.rebuild")) == rebuild
@@ -0,0 +1,13 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize("command", ["finish", "skip", "due", "remind", "recur"])
+async def test_command_commits_once(make_task, run_command, command):
+    await make_task("wash", ["u1", "u2"])
+    closed = []
+    await run_command(command, "wash", on_close=closed.append)
+
+    assert len(closed) == 2
+    assert sum(service.commit_count for service in closed) == 1
@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+import pytest
+from nonebot_plugin_orm import get_session
+
+from nonebot_plugin_yareminder.service import TaskService, AssigneeService, MaintenanceService
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_concurrent_first_finishes_both_count(make_task, group):
+    task_id = await make_task("wash", ["u1"])
+    async with AssigneeService(get_session()) as assignee_service:
+        [assignee_id] = await assignee_service.add_assignees(["u1"])
+
+    finish_time = datetime.now()
+    async with TaskService(get_session()) as first, TaskService(get_session()) as second:
+        # neither finish sees a rollup row of the assignee yet
+        await first.roll_up_delay(await first.get_task_snapshot(task_id), assignee_id, finish_time, 60)
+        await second.roll_up_delay(await second.get_task_snapshot(task_id), assignee_id, finish_time, -30)
+
+    async with TaskService(get_session()) as task_service:
+        for stats in (await task_service.stat_delays(task_id=task_id), await task_service.stat_delays(scope=group)):
+            [stat] = stats
+            assert (stat.count, stat.total.total_seconds(), stat.on_time_rate) == (2, 30, 0.5)
+
+
+async def test_rebuild_keeps_the_chat_stats_of_vacuumed_tasks(make_task, group):
+    vacuumed_id = await make_task("wash", ["u1"])
+    kept_id = await make_task("cook", ["u4"])
+    async with TaskService(get_session()) as task_service:
+        for task_id in (vacuumed_id, vacuumed_id, kept_id):
+            await task_service.finish_task(task_id)
+    async with MaintenanceService(get_session()) as maintenance_service:
+        # one record of the vacuumed task is only left as a summary
+        await maintenance_service.archive_records(datetime.now() + timedelta(seconds=1), 1)
+    async with TaskService(get_session()) as task_service:
+        await task_service.delete_task(vacuumed_id)
+    async with MaintenanceService(get_session()) as maintenance_service:
+        reclaimed = await maintenance_service.vacuum_tasks(datetime.now() + timedelta(seconds=1), 100)
+    assert reclaimed["nonebot_plugin_yareminder_taskmodel"] == 1
+
+    async def chat_counts():
+        async with TaskService(get_session()) as task_service:
+            return sorted((stat.user_id, stat.count) for stat in await task_service.stat_delays(scope=group))
+
+    assert await chat_counts() == [("u1", 2), ("u4", 1)]
+    async with TaskService(get_session()) as task_service:
+        assert await task_service.rebuild_delay_rollups(group) == 3
+    assert await chat_counts() == [("u1", 2), ("u4", 1)]
@@ -0,0 +1,73 @@
+import time
+
+import pytest
+from nonebot_plugin_saa import TargetQQGroup
+
+from nonebot_plugin_yareminder.config import Config
+from nonebot_plugin_yareminder.dispatch import TokenBucket, SendDispatcher
+
+pytestmark = pytest.mark.anyio
+
+
+class RecordedMessage:
+    """Stands in for a MessageFactory, recording its sends in a shared list"""
+
+    def __init__(self, name: str, sent: list, fail: bool = False):
+        self.name = name
+        self.sent = sent
+        self.fail = fail
+
+    async def send_to(self, target):
+        if self.fail:
+            raise RuntimeError(f"{self.name} failed")
+        self.sent.append(self.name)
+
+
+def dispatcher(concurrency=8, target_rate=1000.0, target_burst=10.0) -> SendDispatcher:
+    return SendDispatcher(concurrency, 1000, 10, target_rate, target_burst)
+
+
+async def test_token_bucket_allows_a_burst_then_the_rate():
+    bucket = TokenBucket(rate=100, burst=2)
+    started = time.monotonic()
+    for _ in range(2):
+        await bucket.acquire()
+    assert time.monotonic() - started < 0.005
+    for _ in range(3):
+        await bucket.acquire()
+    assert time.monotonic() - started >= 0.025
+
+
+@pytest.mark.parametrize(("rate", "burst"), [(0, 5), (-1, 5), (1, 0.5)])
+def test_token_bucket_rejects_limits_it_cannot_serve(rate, burst):
+    with pytest.raises(ValueError):
+        TokenBucket(rate, burst)
+
+
+@pytest.mark.parametrize("field", ["yareminder_platform_rate", "yareminder_target_rate"])
+def test_config_rejects_a_zero_rate(field):
+    with pytest.raises(ValueError):
+        Config(**{field: 0})
+
+
+async def test_a_throttled_chat_does_not_hold_up_other_chats():
+    sent = []
+    first, second = TargetQQGroup(group_id=1), TargetQQGroup(group_id=2)
+    stats = await dispatcher(concurrency=1, target_rate=20, target_burst=1).dispatch([
+        (first, RecordedMessage("first 1", sent)),
+        (first, RecordedMessage("first 2", sent)),
+        (first, RecordedMessage("first 3", sent)),
+        (second, RecordedMessage("second", sent)),
+    ])
+    assert sent[:2] == ["first 1", "second"]
+    assert sorted(sent[2:]) == ["first 2", "first 3"]
+    assert (stats.sent, stats.failed) == (4, 0)
+
+
+async def test_a_failed_send_does_not_affect_the_others():
+    sent = []
+    stats = await dispatcher().dispatch(
+        (TargetQQGroup(group_id=i), RecordedMessage(f"chat {i}", sent, fail=i == 2)) for i in range(1, 4)
+    )
+    assert sorted(sent) == ["chat 1", "chat 3"]
+    assert (stats.sent, stats.failed) == (2, 1)
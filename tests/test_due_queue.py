@@ -0,0 +1,95 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from nonebot_plugin_yareminder.due_queue import DueQueue, next_fire_time
+
+START = datetime(2024, 5, 1, 8)
+HOUR = timedelta(hours=1)
+
+
+@pytest.mark.parametrize(("after", "expected"), [
+    (START - HOUR, START),
+    (START, START + HOUR),
+    (START + timedelta(minutes=30), START + HOUR),
+    (START + 5 * HOUR, START + 6 * HOUR),
+])
+def test_next_fire_time_is_on_the_grid(after, expected):
+    assert next_fire_time(START, HOUR, after) == expected
+
+
+def test_next_fire_time_of_a_past_start_without_interval():
+    assert next_fire_time(START, timedelta(0), START + HOUR) is None
+    assert next_fire_time(START, timedelta(0), START - HOUR) == START
+
+
+def test_schedule_skips_missed_fire_times():
+    queue = DueQueue()
+    now = START + timedelta(hours=2, minutes=30)
+    assert queue.schedule("wash", START, HOUR, now=now) == START + 3 * HOUR
+    assert queue.schedule("wash", START + 10 * HOUR, HOUR, now=now) == START + 10 * HOUR
+    assert len(queue) == 1 and queue.next_fire_time("wash") == START + 10 * HOUR
+    assert queue.schedule("once", START, timedelta(0), now=now) is None
+    assert "once" not in queue
+
+
+def test_remove():
+    queue = DueQueue()
+    queue.schedule("wash", START, HOUR, now=START)
+    assert queue.remove("wash")
+    assert not queue.remove("wash")
+    assert len(queue) == 0 and queue.next_fire_time("wash") is None
+
+
+def test_load_leaves_out_tasks_that_never_fire_again():
+    queue = DueQueue()
+    now = datetime.now()
+    missed = now - timedelta(minutes=90)
+    assert queue.load([("wash", missed, HOUR), ("once", missed, timedelta(0)), ("cook", now + HOUR, HOUR)]) == 2
+    assert queue.next_fire_time("wash") == missed + 2 * HOUR
+    assert queue.next_fire_time("cook") == now + HOUR
+
+
+@pytest.mark.anyio
+async def test_fires_due_tasks_and_reschedules_them():
+    fired = []
+
+    async def callback(task_id):
+        fired.append(task_id)
+
+    queue = DueQueue()
+    queue.start(callback)
+    try:
+        start = datetime.now() + timedelta(milliseconds=20)
+        queue.schedule("wash", start, HOUR)
+        queue.schedule("removed", start, HOUR)
+        queue.schedule("later", start + HOUR, HOUR)
+        queue.remove("removed")
+        await asyncio.sleep(0.1)
+    finally:
+        queue.shutdown()
+
+    assert fired == ["wash"]
+    assert queue.next_fire_time("wash") == start + HOUR
+    assert queue.next_fire_time("later") == start + HOUR
+
+
+@pytest.mark.anyio
+async def test_shutdown_keeps_the_entries():
+    fired = []
+
+    async def callback(task_id):
+        fired.append(task_id)
+
+    queue = DueQueue()
+    queue.start(callback)
+    queue.schedule("wash", datetime.now() + timedelta(milliseconds=20), HOUR)
+    queue.shutdown()
+    await asyncio.sleep(0.05)
+    assert fired == [] and "wash" in queue
+
+    queue.start(callback)
+    await asyncio.sleep(0.01)
+    queue.shutdown()
+    assert fired == ["wash"]
@@ -0,0 +1,42 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from nonebot_plugin_orm import get_session
+
+from nonebot_plugin_yareminder.due_queue import due_queue
+from nonebot_plugin_yareminder.service import TaskService
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def fired(monkeypatch):
+    fired = []
+
+    async def send_reminder(task_id):
+        fired.append(task_id)
+
+    monkeypatch.setattr(TaskService, "send_reminder", send_reminder)
+    yield fired
+    due_queue.shutdown()
+
+
+async def test_load_due_queue_schedules_the_tasks_and_fires_the_due_one(make_task, fired):
+    # reminded an hour before the due time, so the first reminder is due shortly
+    first_reminder = datetime.now() + timedelta(milliseconds=200)
+    due_id = await make_task("wash", due_time=first_reminder + timedelta(hours=1))
+    later_id = await make_task("cook", due_time=datetime.now() + timedelta(days=1))
+    deleted_id = await make_task("dust")
+    async with TaskService(get_session()) as task_service:
+        await task_service.delete_task(deleted_id)
+    # as after a restart, the queue only knows what it loads from the database
+    for task_id in (due_id, later_id, deleted_id):
+        due_queue.remove(task_id)
+
+    await TaskService.load_due_queue()
+    assert due_queue.next_fire_time(due_id) == first_reminder
+    assert later_id in due_queue and deleted_id not in due_queue
+    await asyncio.sleep((first_reminder - datetime.now()).total_seconds() + 0.05)
+
+    assert fired == [due_id]
@@ -0,0 +1,106 @@
+import pytest
+from nonebot_plugin_orm import get_session
+from nonebot_plugin_saa import TargetQQGroup, TargetQQPrivate, Text
+from sqlalchemy import select
+
+from nonebot_plugin_yareminder.models import UserTargetModel
+from nonebot_plugin_yareminder.service import TaskService, AssigneeService, reachability_seen
+
+pytestmark = pytest.mark.anyio
+
+
+async def remind(*task_ids):
+    """The escalated sends of one reminder of each task, committed like a fired reminder"""
+    async with TaskService(get_session()) as task_service:
+        tasks = [await task_service.get_task_snapshot(task_id) for task_id in task_ids]
+        return await task_service.escalate_reminders(tasks)
+
+
+def texts(msg) -> str:
+    return "".join(segment.data["text"] for segment in msg if isinstance(segment, Text))
+
+
+async def set_escalation(task_id, escalate_after):
+    async with TaskService(get_session()) as task_service:
+        await task_service.set_task(task_id, escalate_after=escalate_after)
+
+
+async def recorded_chats(user_id) -> int:
+    async with get_session() as session:
+        return len((await session.execute(select(UserTargetModel).where(UserTargetModel.user_id == user_id))).all())
+
+
+@pytest.fixture
+async def wash(make_task, group):
+    """wash in group 1 assigned to u1 then u2; u1 was seen in groups 1 to 3, u2 in a private chat"""
+    task_id = await make_task("wash", ["u1", "u2"])
+    for target in (group, TargetQQGroup(group_id=2), TargetQQGroup(group_id=3)):
+        await TaskService.record_reachability("u1", target)
+    await TaskService.record_reachability("u2", TargetQQPrivate(user_id=2))
+    return task_id
+
+
+async def test_escalates_once_reminded_escalate_after_times(wash):
+    await set_escalation(wash, 2)
+    assert await remind(wash) == []
+    assert await remind(wash) == []
+
+    sends = await remind(wash)
+    # the other chats of the current assignee, not the chat of the task
+    assert {target for target, _ in sends} == {TargetQQGroup(group_id=2), TargetQQGroup(group_id=3)}
+    assert all("wash" in texts(msg) and "（第3次提醒）" in texts(msg) for _, msg in sends)
+    assert len(await remind(wash)) == 2
+
+
+@pytest.mark.parametrize(("escalate_after", "escalated"), [(None, False), (0, True), (1, False)])
+async def test_first_reminder(wash, escalate_after, escalated):
+    await set_escalation(wash, escalate_after)
+    assert bool(await remind(wash)) == escalated
+
+
+async def test_escalates_to_the_chats_of_every_escalated_assignee(wash, make_task):
+    cook = await make_task("cook", ["u2"])
+    await set_escalation(wash, 0)
+    await set_escalation(cook, 0)
+    sends = await remind(wash, cook)
+    assert sorted((str(target), "cook" in texts(msg)) for target, msg in sends) == sorted([
+        (str(TargetQQGroup(group_id=2)), False), (str(TargetQQGroup(group_id=3)), False),
+        (str(TargetQQPrivate(user_id=2)), True),
+    ])
+
+
+@pytest.mark.parametrize("action", ["finish", "skip"])
+async def test_finish_and_skip_reset_the_count(wash, action):
+    await set_escalation(wash, 1)
+    await remind(wash)
+    assert await remind(wash)
+
+    async with TaskService(get_session()) as task_service:
+        if action == "finish":
+            await task_service.finish_task(wash)
+        else:
+            await task_service.skip_task(wash, 1)
+
+    assert await remind(wash) == []
+    # the turn moved on to u2
+    assert [target for target, _ in await remind(wash)] == [TargetQQPrivate(user_id=2)]
+
+
+async def test_only_assignees_are_recorded(wash):
+    await TaskService.record_reachability("u3", TargetQQGroup(group_id=2))
+    assert await recorded_chats("u3") == 0
+    assert await recorded_chats("u1") == 3
+
+    # a new assignee is recorded from the next message on, even in a chat it was checked in before
+    async with AssigneeService(get_session()) as assignee_service:
+        await assignee_service.add_assignees(["u3"])
+    await TaskService.record_reachability("u3", TargetQQGroup(group_id=2))
+    assert await recorded_chats("u3") == 1
+
+
+async def test_recorded_pairs_are_bounded(wash, monkeypatch):
+    monkeypatch.setattr(reachability_seen, "maxsize", 2)
+    for group_id in range(10, 15):
+        await TaskService.record_reachability("u1", TargetQQGroup(group_id=group_id))
+    assert len(reachability_seen) == 2
+    assert await recorded_chats("u1") == 8
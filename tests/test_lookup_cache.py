@@ -0,0 +1,31 @@
+import pytest
+from nonebot_plugin_orm import get_session
+from sqlalchemy.exc import NoResultFound
+
+from nonebot_plugin_yareminder.service import TaskService, task_lookup_cache
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_lookup_cached_before_the_commit_of_a_delete_is_dropped(make_task, group):
+    task_id = await make_task("wash")
+    async with TaskService(get_session()) as task_service:
+        key = (await task_service.resolve_target_id(group), "wash")
+        await task_service.delete_task(task_id)
+        # a concurrent command finds the task, as the delete is not committed yet
+        task_lookup_cache.put(key, task_id)
+
+    assert task_lookup_cache.get(key) is None
+    async with TaskService(get_session()) as task_service:
+        with pytest.raises(NoResultFound):
+            await task_service.find_task_id("wash", group)
+
+
+async def test_rolled_back_write_keeps_nothing_stale(make_task, group):
+    task_id = await make_task("wash")
+    async with TaskService(get_session()) as task_service:
+        await task_service.set_task(task_id, name="dishes")
+        await task_service.rollback()
+
+    async with TaskService(get_session()) as task_service:
+        assert await task_service.find_task_id("wash", group) == task_id
@@ -0,0 +1,128 @@
+"""The natural language rendering of dates and durations against a frozen copy of the
+pendulum based implementation it replaced, on seeded random inputs."""
+import random
+from datetime import datetime, timedelta
+
+import pendulum
+import pytest
+
+from nonebot_plugin_yareminder.utils import natural_lang_timedelta, natural_lang_date, natural_lang_dates, date_renderer
+
+
+def old_natural_lang_timedelta(diff: timedelta):
+    negative = diff.total_seconds() < 0
+    diff = pendulum.duration(
+        days=diff.days,
+        seconds=diff.seconds,
+        microseconds=diff.microseconds
+    )
+    if negative:
+        diff = -diff
+    msg = ""
+
+    if int(diff.total_days()) != 0:
+        if diff.days == 0:
+            msg += f"{diff.weeks}周"
+        else:
+            msg += f"{int(diff.total_days())}天"
+
+    if int(diff.seconds) != 0:
+        if diff.hours != 0:
+            msg += f"{diff.hours}小时"
+        if diff.minutes != 0:
+            msg += f"{diff.minutes}分"
+        if diff.seconds % 60 != 0:
+            msg += f"{diff.seconds % 60}秒"
+
+    return msg, negative
+
+
+def old_natural_lang_date(target_date: datetime, today=None):
+    weekday_name = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"]
+    answer = ""
+
+    if today is None:
+        today = datetime.today()
+
+    target_date = pendulum.instance(target_date)
+    today = pendulum.instance(today)
+
+    # 计算日期差（以天为单位）
+    days_diff = (target_date.date() - today.date()).days
+
+    # 如果日期相同
+    if days_diff == 0:
+        answer += "今天"
+    elif days_diff == 1:
+        answer += "明天"
+    elif days_diff == -1:
+        answer += "昨天"
+    elif days_diff == 2:
+        answer += "后天"
+    elif days_diff == -2:
+        answer += "前天"
+
+    if answer != "":
+        return answer + target_date.strftime("%H:%M")
+
+    # 通过所在周起始日计算周数差
+    target_date_week_start = target_date - pendulum.duration(days=target_date.weekday())
+    today_week_start = today - pendulum.duration(days=today.weekday())
+    weeks_diff = (target_date_week_start - today_week_start).in_weeks()
+    weekday = weekday_name[target_date.weekday()]
+
+    # 处理在三周以内的日期
+    if weeks_diff == 0:
+        answer += f"本{weekday}"
+    elif weeks_diff == 1:
+        answer += f"下{weekday}"
+    elif weeks_diff == 2:
+        answer += f"两周后的{weekday}"
+    elif weeks_diff == -1:
+        answer += f"上{weekday}"
+    elif weeks_diff == -2:
+        answer += f"两周前的{weekday}"
+
+    if answer != "":
+        return answer + target_date.strftime("%H:%M")
+
+    # 如果日期不在三周内，则返回标准日期格式
+    return target_date.to_date_string() + target_date.strftime(" %H:%M")
+
+
+@pytest.fixture
+def rng():
+    return random.Random(0)
+
+
+@pytest.mark.parametrize("diff", [
+    timedelta(0), timedelta(weeks=1), timedelta(weeks=2), timedelta(days=-7), timedelta(hours=-1),
+    timedelta(microseconds=1), timedelta(microseconds=-1), timedelta(seconds=-0.5),
+    timedelta(days=1, microseconds=-1), timedelta(days=-1, seconds=1),
+])
+def test_timedelta_edge_cases(diff):
+    assert natural_lang_timedelta(diff) == old_natural_lang_timedelta(diff)
+
+
+def test_random_timedeltas(rng):
+    for _ in range(10000):
+        for diff in (
+                timedelta(seconds=rng.uniform(-90 * 86400, 90 * 86400)),
+                timedelta(seconds=rng.randint(-40 * 86400, 40 * 86400)),
+        ):
+            assert natural_lang_timedelta(diff) == old_natural_lang_timedelta(diff), diff
+
+
+def test_random_dates(rng):
+    base = datetime(2024, 1, 1)
+    for _ in range(10000):
+        today = base + timedelta(seconds=rng.randint(0, 3 * 365 * 86400))
+        target = today + timedelta(seconds=rng.randint(-40 * 86400, 40 * 86400), microseconds=rng.randint(0, 999999))
+        assert natural_lang_date(target, today) == old_natural_lang_date(target, today), (target, today)
+        assert date_renderer(today.date()).render(target) == old_natural_lang_date(target, today), (target, today)
+
+
+def test_dates_relative_to_now():
+    today = datetime.today()
+    targets = [today + timedelta(hours=hours) for hours in range(-1000, 1000, 7)]
+    assert natural_lang_dates(targets) == [old_natural_lang_date(target) for target in targets]
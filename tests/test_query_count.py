@@ -0,0 +1,33 @@
+import pytest
+from nonebot_plugin_orm import get_session
+
+from nonebot_plugin_yareminder.service import TaskService
+from nonebot_plugin_yareminder.sql_trace import SQLTracer
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(scope="module")
+def tracer():
+    tracer = SQLTracer({}, log=False)
+    tracer.install()
+    return tracer
+
+
+async def count_ls_statements(tracer, group) -> int:
+    async with TaskService(get_session()) as task_service:
+        with tracer.trace("ls") as trace:
+            tasks = await task_service.list_tasks(group)
+            task_service.render_task_list(tasks, "")
+    return len(trace.statements)
+
+
+async def test_ls_statement_count_is_independent_of_task_count(tracer, make_task, group):
+    counts = {}
+    created = 0
+    for task_count in (5, 50):
+        while created < task_count:
+            await make_task(f"task{created}", [f"u{created % 7}", f"u{(created + 1) % 7}"])
+            created += 1
+        counts[task_count] = await count_ls_statements(tracer, group)
+    assert 0 < counts[5] == counts[50], counts
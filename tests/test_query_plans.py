@@ -0,0 +1,112 @@
+"""The hot lookups are answered from indexes, checked with SQLite's EXPLAIN QUERY PLAN"""
+from contextlib import contextmanager
+
+import pytest
+from nonebot_plugin_orm import get_session
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+
+from nonebot_plugin_yareminder.service import TaskService, task_lookup_cache
+
+pytestmark = pytest.mark.anyio
+
+TASK_TABLE = "nonebot_plugin_yareminder_taskmodel"
+ASSIGNEE_TABLE = "nonebot_plugin_yareminder_assigneemodel"
+ASSIGNMENT_TABLE = "nonebot_plugin_yareminder_assignmentmodel"
+
+
+@contextmanager
+def capture_selects():
+    """Collect the SELECT statements issued in the block with their parameters"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, "before_cursor_execute", before_cursor_execute)
+
+
+async def query_plans(statements) -> list[str]:
+    """The EXPLAIN QUERY PLAN details of every statement, one string per statement"""
+    plans = []
+    async with get_session() as session:
+        connection = await session.connection()
+        for statement, parameters in statements:
+            rows = await connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            plans.append("\n".join(row[-1] for row in rows))
+    return plans
+
+
+async def index_on(table: str, columns: set[str]) -> str:
+    """The name of the index over exactly `columns`, SQLite names the ones of constraints by position"""
+    async with get_session() as session:
+        for row in (await session.execute(text(f"PRAGMA index_list('{table}')"))).all():
+            index_columns = (await session.execute(text(f"PRAGMA index_info('{row.name}')"))).all()
+            if {column.name for column in index_columns} == columns:
+                return row.name
+    raise LookupError(f"No index on {columns} of {table}")
+
+
+def plan_of(statements, plans, table: str) -> str:
+    """The plan of the first statement reading `table`"""
+    return next(plan for (statement, _), plan in zip(statements, plans) if f"FROM {table}" in statement)
+
+
+def assert_uses_index(plan: str, table: str, index: str):
+    assert f"SCAN {table}" not in plan, plan
+    assert f"INDEX {index} " in plan, plan
+
+
+async def traced(call):
+    """Run `call(task_service)` with a cold lookup cache, returns the plans of its statements"""
+    task_lookup_cache.clear()
+    with capture_selects() as statements:
+        async with TaskService(get_session()) as task_service:
+            await call(task_service)
+    return statements, await query_plans(statements)
+
+
+@pytest.fixture
+async def tasks(make_task, group):
+    task_ids = [await make_task(f"task{i}", ["u1", "u2"] if i % 2 else ["u3"]) for i in range(20)]
+    async with TaskService(get_session()) as task_service:
+        for task_id in task_ids[:5]:
+            await task_service.finish_task(task_id)
+    return task_ids
+
+
+async def test_find_task_id_uses_the_unique_name_index(tasks, group):
+    statements, plans = await traced(lambda task_service: task_service.find_task_id("task3", group))
+    index = await index_on(TASK_TABLE, {"name", "target_id", "is_deleted", "deleted_at"})
+    assert_uses_index(plan_of(statements, plans, TASK_TABLE), TASK_TABLE, index)
+
+
+async def test_list_tasks_uses_the_scope_index(tasks, group):
+    statements, plans = await traced(lambda task_service: task_service.list_tasks(group))
+    assert_uses_index(plan_of(statements, plans, TASK_TABLE), TASK_TABLE, "ix_nonebot_plugin_yareminder_taskmodel_scope")
+
+
+async def test_list_tasks_of_a_user_uses_the_assignee_indexes(tasks, group):
+    statements, plans = await traced(lambda task_service: task_service.list_tasks(group, user_id="u1"))
+    plan = plan_of(statements, plans, TASK_TABLE)
+    assert_uses_index(plan, TASK_TABLE, "ix_nonebot_plugin_yareminder_taskmodel_scope")
+    assert_uses_index(plan, ASSIGNEE_TABLE, await index_on(ASSIGNEE_TABLE, {"user_id"}))
+    assert_uses_index(plan, ASSIGNMENT_TABLE, "ix_nonebot_plugin_yareminder_assignmentmodel_assignee")
+
+
+async def test_stat_delays_of_a_task_uses_the_rollup_key(tasks, group):
+    statements, plans = await traced(lambda task_service: task_service.stat_delays(task_id=tasks[1]))
+    table = "nonebot_plugin_yareminder_delayrollupmodel"
+    assert_uses_index(plan_of(statements, plans, table), table, await index_on(table, {"task_id", "assignee_id"}))
+
+
+async def test_stat_delays_of_a_chat_uses_the_monthly_rollup_key(tasks, group):
+    statements, plans = await traced(lambda task_service: task_service.stat_delays(scope=group))
+    table = "nonebot_plugin_yareminder_monthlydelayrollupmodel"
+    index = await index_on(table, {"target_id", "assignee_id", "month"})
+    assert_uses_index(plan_of(statements, plans, table), table, index)
@@ -0,0 +1,47 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from nonebot_plugin_apscheduler import scheduler
+from nonebot_plugin_orm import get_session
+from sqlalchemy import select
+
+from nonebot_plugin_yareminder.jobstore import ReminderJobStore
+from nonebot_plugin_yareminder.models import TaskModel
+from nonebot_plugin_yareminder.service import TaskService, add_reminder_job, REMINDER_JOB_OPTIONS
+
+pytestmark = pytest.mark.anyio
+
+JOBSTORE = 'nonebot-plugin-yareminder-jobstore'
+
+
+@pytest.fixture
+async def jobstore(tmp_path):
+    jobstore = ReminderJobStore(url="sqlite:///" + str(tmp_path / "apscheduler.sqlite3"))
+    scheduler.start(paused=True)
+    scheduler.add_jobstore(jobstore, alias=JOBSTORE)
+    yield jobstore
+    scheduler.shutdown(wait=False)
+    scheduler.remove_jobstore(JOBSTORE)
+
+
+async def test_reconcile_writes_the_jobs_of_every_task(make_task, jobstore):
+    task_ids = {await make_task(name) for name in ("wash", "dishes", "trash")}
+    add_reminder_job("orphan", uuid.uuid4(), "deleted", datetime.now(), timedelta(hours=1))
+
+    assert await TaskService.reconcile_reminders(jobstore) == (1, 3, 0)
+
+    async with TaskService(get_session()) as task_service:
+        job_ids = dict(
+            (await task_service.session.execute(select(TaskModel.id, TaskModel.apscheduler_job_id))).all()
+        )
+    assert job_ids.keys() == task_ids
+    jobs = {job.id: job for job in scheduler.get_jobs(JOBSTORE)}
+    assert jobs.keys() == set(job_ids.values())
+    assert {job_ids[job.args[0]] for job in jobs.values()} == set(jobs)
+    assert all(
+        (job.misfire_grace_time, job.coalesce, job.max_instances) == tuple(REMINDER_JOB_OPTIONS.values())
+        for job in jobs.values()
+    )
+    # the written jobs are current, a second pass finds nothing to do
+    assert await TaskService.reconcile_reminders(jobstore) == (0, 0, 0)
@@ -0,0 +1,48 @@
+import pytest
+
+from nonebot_plugin_yareminder.sql_trace import SQLTracer
+
+from conftest import COMMAND_FLOWS
+
+pytestmark = pytest.mark.anyio
+
+# SQL statements per rmd subcommand on a task with three assignees, with the chat and the task lookup cached.
+# Lower a budget when a command gets cheaper; raising one needs a reason.
+BUDGETS = {
+    "add": 2,
+    "finish": 10,
+    "skip": 5,
+    "due": 4,
+    "remind": 4,
+    "recur": 4,
+    "assign": 7,
+    "ls": 1,
+    "stat": 2,
+}
+
+
+@pytest.fixture(scope="module")
+def tracer():
+    tracer = SQLTracer(BUDGETS, log=False)
+    tracer.install()
+    return tracer
+
+
+def test_every_command_has_a_budget():
+    assert BUDGETS.keys() == COMMAND_FLOWS.keys()
+
+
+@pytest.mark.parametrize("command", BUDGETS)
+async def test_command_stays_within_its_statement_budget(tracer, make_task, run_command, command):
+    await make_task("wash", ["u1", "u2", "u3"])
+    await make_task("cook", ["u2"])
+    # a completion record to stat, and the chat and task lookup cached as after earlier commands
+    await run_command("finish", "wash")
+
+    with tracer.trace(command) as trace:
+        await run_command(command, "wash")
+
+    assert not tracer.exceeds_budget(trace), (
+        f"rmd {command} issued {len(trace.statements)} statements, budget {BUDGETS[command]}:\n"
+        + "\n".join(statement for statement, _ in trace.statements)
+    )
@@ -0,0 +1,15 @@
+from nonebot_plugin_saa import MessageFactory, Mention, Text
+
+from nonebot_plugin_yareminder.template import compile_template, DEFAULT_REMINDER_TEMPLATE
+
+
+def test_render_splices_segments_and_skips_empty_values():
+    template = compile_template(DEFAULT_REMINDER_TEMPLATE)
+    assignee = [Mention("u1"), Text(" ")]
+
+    msg = template.render({"assignee": assignee, "due": "在明天08:00前完成", "name": "洗碗"})
+    assert isinstance(msg, MessageFactory)
+    assert list(msg) == [Mention("u1"), Text(" "), Text("请记得"), Text("在明天08:00前完成"), Text("洗碗")]
+
+    msg = template.render({"assignee": [], "due": "", "name": "洗碗"})
+    assert list(msg) == [Text("请记得"), Text("洗碗")]
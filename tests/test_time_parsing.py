@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from nonebot_plugin_yareminder.timeparse import TimeParseError, compile_datetime, parse_timedelta
+
+# A Wednesday
+NOW = datetime(2024, 5, 1, 10, 0)
+
+
+@pytest.mark.parametrize(("s", "expected"), [
+    # ISO 8601
+    ("2024-05-01", datetime(2024, 5, 1)),
+    ("2024-05-01 08:00", datetime(2024, 5, 1, 8)),
+    ("2024-05-01T08:00:00", datetime(2024, 5, 1, 8)),
+    ("2024-05-01T08:00:00+08:00",
+     datetime(2024, 5, 1, 8, tzinfo=timezone(timedelta(hours=8))).astimezone().replace(tzinfo=None)),
+    ("20240501T0800", datetime(2024, 5, 1, 8)),
+    # relative days
+    ("今天8点", datetime(2024, 5, 1, 8)),
+    ("明天8点", datetime(2024, 5, 2, 8)),
+    ("后天下午3点半", datetime(2024, 5, 3, 15, 30)),
+    ("大后天", datetime(2024, 5, 4)),
+    ("八点", datetime(2024, 5, 1, 8)),
+    ("二十三点十五分", datetime(2024, 5, 1, 23, 15)),
+    # weekdays, from today on unless the week is given
+    ("周三", datetime(2024, 5, 1)),
+    ("周五", datetime(2024, 5, 3)),
+    ("周一", datetime(2024, 5, 6)),
+    ("星期日", datetime(2024, 5, 5)),
+    ("礼拜7", datetime(2024, 5, 5)),
+    ("本周一", datetime(2024, 4, 29)),
+    ("这周五", datetime(2024, 5, 3)),
+    ("上周五", datetime(2024, 4, 26)),
+    ("下周三", datetime(2024, 5, 8)),
+    ("下下周三", datetime(2024, 5, 15)),
+    ("周五晚上8:30", datetime(2024, 5, 3, 20, 30)),
+    # month days roll over to next year once past, unless the year is given
+    ("12月25号8点", datetime(2024, 12, 25, 8)),
+    ("5月1日", datetime(2024, 5, 1)),
+    ("4月30日", datetime(2025, 4, 30)),
+    ("2023年4月30日", datetime(2023, 4, 30)),
+    # periods
+    ("凌晨1点", datetime(2024, 5, 1, 1)),
+    ("凌晨12点", datetime(2024, 5, 1, 0)),
+    ("早上8点", datetime(2024, 5, 1, 8)),
+    ("上午11点", datetime(2024, 5, 1, 11)),
+    ("中午11点", datetime(2024, 5, 1, 11)),
+    ("中午12点", datetime(2024, 5, 1, 12)),
+    ("今天中午12点", datetime(2024, 5, 1, 12)),
+    ("中午1点", datetime(2024, 5, 1, 13)),
+    ("下午3点", datetime(2024, 5, 1, 15)),
+    ("下午12点", datetime(2024, 5, 1, 12)),
+    ("傍晚6点", datetime(2024, 5, 1, 18)),
+    ("晚上8点", datetime(2024, 5, 1, 20)),
+    ("晚上12点", datetime(2024, 5, 2, 0)),
+    ("晚上12点半", datetime(2024, 5, 2, 0, 30)),
+    ("明天晚上12点", datetime(2024, 5, 3, 0)),
+    ("周五晚上12点", datetime(2024, 5, 4, 0)),
+    ("4月30日晚上12点", datetime(2025, 5, 1, 0)),
+    # durations from now
+    ("3天后", datetime(2024, 5, 4, 10)),
+    ("半小时后", datetime(2024, 5, 1, 10, 30)),
+    ("2小时30分后", datetime(2024, 5, 1, 12, 30)),
+    ("1天半后", datetime(2024, 5, 2, 22)),
+])
+def test_datetime(s, expected):
+    assert compile_datetime(s).resolve(NOW) == expected
+
+
+@pytest.mark.parametrize("s", ["下午", "2月30日", "明天25点", "周八", "abc"])
+def test_invalid_datetime(s):
+    with pytest.raises(TimeParseError):
+        compile_datetime(s)
+
+
+@pytest.mark.parametrize(("s", "expected"), [
+    # compact
+    ("", timedelta(0)),
+    ("3d5h19m1s", timedelta(days=3, hours=5, minutes=19, seconds=1)),
+    ("-5h30m", -timedelta(hours=5, minutes=30)),
+    ("1d", timedelta(days=1)),
+    ("2w", timedelta(weeks=2)),
+    ("+3h", timedelta(hours=3)),
+    # Chinese
+    ("3天", timedelta(days=3)),
+    ("2小时30分", timedelta(hours=2, minutes=30)),
+    ("十分钟", timedelta(minutes=10)),
+    ("半小时", timedelta(minutes=30)),
+    ("一个小时", timedelta(hours=1)),
+    ("一个半小时", timedelta(hours=1, minutes=30)),
+    ("1小时半", timedelta(hours=1, minutes=30)),
+    ("1天半", timedelta(days=1, hours=12)),
+    ("1天半小时", timedelta(days=1, minutes=30)),
+    ("两个星期", timedelta(weeks=2)),
+    ("每2周", timedelta(weeks=2)),
+    ("每天", timedelta(days=1)),
+    ("提前1天", -timedelta(days=1)),
+    ("延后2小时", timedelta(hours=2)),
+])
+def test_timedelta(s, expected):
+    assert parse_timedelta(s) == expected
+
+
+@pytest.mark.parametrize("s", ["h", "-", "半", "abc", "3天后"])
+def test_invalid_timedelta(s):
+    with pytest.raises(TimeParseError):
+        parse_timedelta(s)
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+import pytest
+from nonebot_plugin_orm import get_session
+from sqlalchemy import func, select
+
+from nonebot_plugin_yareminder.models import (
+    TaskModel, AssignmentModel, RecordModel, RecordSummaryModel, DelayRollupModel, VacuumedRecordSummaryModel
+)
+from nonebot_plugin_yareminder.service import TaskService, MaintenanceService
+
+pytestmark = pytest.mark.anyio
+
+# Vacuums every task deleted so far
+EVERYTHING = timedelta(seconds=-1)
+
+
+async def rows(model, task_id) -> int:
+    async with get_session() as session:
+        return await session.scalar(select(func.count()).select_from(model).where(model.task_id == task_id))
+
+
+async def finish_and_delete(task_id, archive=False):
+    async with TaskService(get_session()) as task_service:
+        await task_service.finish_task(task_id)
+        await task_service.finish_task(task_id)
+    if archive:
+        async with MaintenanceService(get_session()) as maintenance_service:
+            # one of the two records is only left as a summary
+            await maintenance_service.archive_records(datetime.now() + timedelta(seconds=1), 1)
+    async with TaskService(get_session()) as task_service:
+        await task_service.delete_task(task_id)
+
+
+async def test_vacuums_deleted_tasks_with_their_rows_in_batches(make_task):
+    deleted = [await make_task(name, ["u1", "u2"]) for name in ("wash", "cook", "mop")]
+    kept = await make_task("sweep", ["u1"])
+    for task_id in deleted:
+        await finish_and_delete(task_id, archive=task_id == deleted[0])
+    async with TaskService(get_session()) as task_service:
+        await task_service.finish_task(kept)
+
+    reclaimed = await MaintenanceService.vacuum_deleted_tasks(EVERYTHING, 2)
+    assert reclaimed[TaskModel.__tablename__] == 3
+    assert reclaimed[AssignmentModel.__tablename__] == 6
+    assert reclaimed[RecordModel.__tablename__] == 5 and reclaimed[RecordSummaryModel.__tablename__] == 1
+    for task_id in deleted:
+        for model in (AssignmentModel, RecordModel, RecordSummaryModel, DelayRollupModel):
+            assert await rows(model, task_id) == 0, model
+    async with get_session() as session:
+        assert await session.get(TaskModel, deleted[0]) is None
+        # the history of the vacuumed tasks is kept per chat
+        summaries = (await session.execute(select(VacuumedRecordSummaryModel))).scalars().all()
+        assert sum(summary.count for summary in summaries) == 6
+
+    assert await rows(AssignmentModel, kept) == 1 and await rows(RecordModel, kept) == 1
+
+
+async def test_tasks_deleted_within_the_grace_period_are_kept(make_task):
+    wash = await make_task("wash", ["u1"])
+    await finish_and_delete(wash)
+    assert await MaintenanceService.vacuum_deleted_tasks(timedelta(days=1), 100) == {}
+    assert await rows(RecordModel, wash) == 2